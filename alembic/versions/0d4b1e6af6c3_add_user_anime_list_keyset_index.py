@@ -0,0 +1,33 @@
+"""add keyset index for user anime list
+
+Revision ID: 0d4b1e6af6c3
+Revises: 573b0842e2ba
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0d4b1e6af6c3'
+down_revision: Union[str, Sequence[str], None] = '573b0842e2ba'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # /users/me/list: WHERE user_id ORDER BY created_at DESC, id DESC + keyset по (created_at, id)
+    op.create_index(
+        'ix_user_anime_list_user_created_id',
+        'user_anime_list',
+        ['user_id', sa.text('created_at DESC'), sa.text('id DESC')],
+    )
+    # префикс user_id покрывают и новый индекс, и uq_user_anime
+    op.drop_index('ix_user_anime_list_user_id', table_name='user_anime_list')
+
+
+def downgrade() -> None:
+    op.create_index('ix_user_anime_list_user_id', 'user_anime_list', ['user_id'])
+    op.drop_index('ix_user_anime_list_user_created_id', table_name='user_anime_list')
@@ -0,0 +1,28 @@
+"""add anime (year, score, id) index
+
+Revision ID: 0f4d996f8868
+Revises: e73ee77d5e2c
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0f4d996f8868'
+down_revision: Union[str, Sequence[str], None] = 'e73ee77d5e2c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # в (year, season, score, id) между year и score стоит season — фильтр только по году шёл через Sort
+    op.create_index(
+        'ix_anime_year_score_id', 'anime', ['year', sa.text('score DESC NULLS LAST'), sa.text('id DESC')]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_anime_year_score_id', table_name='anime')
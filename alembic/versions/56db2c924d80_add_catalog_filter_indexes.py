@@ -0,0 +1,36 @@
+"""add composite indexes for catalog filters
+
+Revision ID: 56db2c924d80
+Revises: 77e55729dcbd
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '56db2c924d80'
+down_revision: Union[str, Sequence[str], None] = '77e55729dcbd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# хвост каждого индекса повторяет ORDER BY каталога, чтобы не было Sort
+ORDER = [sa.text('score DESC NULLS LAST'), sa.text('id DESC')]
+
+
+def upgrade() -> None:
+    op.create_index('ix_anime_status_score_id', 'anime', ['status', *ORDER])
+    # year + season (текущий сезон) — самый частый фильтр; только year — ix_anime_year_score_id
+    op.create_index('ix_anime_year_season_score_id', 'anime', ['year', 'season', *ORDER])
+    op.create_index('ix_anime_season_score_id', 'anime', ['season', *ORDER])
+    # PK (anime_id, genre_id) не помогает фильтру по жанру
+    op.create_index('ix_anime_genres_genre_id', 'anime_genres', ['genre_id', 'anime_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_anime_genres_genre_id', table_name='anime_genres')
+    op.drop_index('ix_anime_season_score_id', table_name='anime')
+    op.drop_index('ix_anime_year_season_score_id', table_name='anime')
+    op.drop_index('ix_anime_status_score_id', table_name='anime')
@@ -0,0 +1,58 @@
+"""add user_genre_affinity table
+
+Revision ID: 573b0842e2ba
+Revises: 56db2c924d80
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '573b0842e2ba'
+down_revision: Union[str, Sequence[str], None] = '56db2c924d80'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'user_genre_affinity',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('genre_id', sa.Integer(), nullable=False),
+        sa.Column('weight', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['genre_id'], ['genre.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'genre_id'),
+    )
+    op.create_index(
+        'ix_user_genre_affinity_user_weight',
+        'user_genre_affinity',
+        ['user_id', sa.text('weight DESC')],
+    )
+
+    # те же веса, что и в user_anime_list_repo.entry_weight
+    op.execute(
+        """
+        INSERT INTO user_genre_affinity (user_id, genre_id, weight)
+        SELECT ual.user_id, ag.genre_id, sum(
+            CASE ual.status
+                WHEN 'completed' THEN 1.0
+                WHEN 'watching' THEN 0.8
+                WHEN 'on_hold' THEN 0.4
+                WHEN 'plan_to_watch' THEN 0.3
+                WHEN 'dropped' THEN -0.5
+            END + coalesce((ual.score - 5) / 5, 0)
+        )
+        FROM user_anime_list ual
+        JOIN anime_genres ag ON ag.anime_id = ual.anime_id
+        GROUP BY ual.user_id, ag.genre_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_genre_affinity_user_weight', table_name='user_genre_affinity')
+    op.drop_table('user_genre_affinity')
@@ -0,0 +1,26 @@
+"""add anime.sync_claimed_at lease for the sync scheduler
+
+Revision ID: 695d2542deb0
+Revises: 8b6ca0c3256e
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '695d2542deb0'
+down_revision: Union[str, Sequence[str], None] = '8b6ca0c3256e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # claim_stale больше не трогает last_synced_at — неудачный fetch не выглядит свежим
+    op.add_column('anime', sa.Column('sync_claimed_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('anime', 'sync_claimed_at')
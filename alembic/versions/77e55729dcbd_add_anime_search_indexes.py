@@ -0,0 +1,57 @@
+"""add anime full-text search vector and trigram indexes
+
+Revision ID: 77e55729dcbd
+Revises: dffa897047be
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision: str = '77e55729dcbd'
+down_revision: Union[str, Sequence[str], None] = 'dffa897047be'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(title_english, '')), 'A') "
+    "|| setweight(to_tsvector('simple', coalesce(title_japanese, '')), 'B') "
+    "|| setweight(to_tsvector('english', coalesce(synopsis, '')), 'C')"
+)
+
+TRGM_COLUMNS = ('title', 'title_english', 'title_japanese')
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    op.add_column(
+        'anime',
+        sa.Column(
+            'search_vector',
+            postgresql.TSVECTOR(),
+            sa.Computed(SEARCH_VECTOR, persisted=True),
+            nullable=True,
+        ),
+    )
+    op.create_index('ix_anime_search_vector', 'anime', ['search_vector'], postgresql_using='gin')
+
+    for column in TRGM_COLUMNS:
+        op.create_index(
+            f'ix_anime_{column}_trgm',
+            'anime',
+            [column],
+            postgresql_using='gin',
+            postgresql_ops={column: 'gin_trgm_ops'},
+        )
+
+
+def downgrade() -> None:
+    for column in TRGM_COLUMNS:
+        op.drop_index(f'ix_anime_{column}_trgm', table_name='anime')
+    op.drop_index('ix_anime_search_vector', table_name='anime')
+    op.drop_column('anime', 'search_vector')
@@ -0,0 +1,33 @@
+"""index the sync staleness expression used by claim_stale
+
+Revision ID: 8b6ca0c3256e
+Revises: 0f4d996f8868
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '8b6ca0c3256e'
+down_revision: Union[str, Sequence[str], None] = '0f4d996f8868'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # claim_stale сравнивает coalesce(...), а не голый last_synced_at — старый индекс не подходил
+    op.drop_index('ix_anime_status_last_synced_at', table_name='anime')
+    op.create_index(
+        'ix_anime_status_last_synced',
+        'anime',
+        ['status', sa.text('coalesce(last_synced_at, updated_at, created_at)')],
+        postgresql_where=sa.text('mal_id IS NOT NULL'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_anime_status_last_synced', table_name='anime')
+    op.create_index('ix_anime_status_last_synced_at', 'anime', ['status', 'last_synced_at'])
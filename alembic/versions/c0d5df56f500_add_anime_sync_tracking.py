@@ -0,0 +1,40 @@
+"""add last_synced_at and sync_priority to anime
+
+Revision ID: c0d5df56f500
+Revises: 0d4b1e6af6c3
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'c0d5df56f500'
+down_revision: Union[str, Sequence[str], None] = '0d4b1e6af6c3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('anime', sa.Column('last_synced_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('anime', sa.Column('sync_priority', sa.Integer(), server_default='0', nullable=False))
+    # выбор устаревших: по статусу и давности синка
+    op.create_index('ix_anime_status_last_synced_at', 'anime', ['status', 'last_synced_at'])
+
+    # всё, что есть в базе, когда-то пришло из Jikan
+    op.execute("UPDATE anime SET last_synced_at = coalesce(updated_at, created_at) WHERE mal_id IS NOT NULL")
+    op.execute(
+        """
+        UPDATE anime SET sync_priority = counts.users
+        FROM (SELECT anime_id, count(*) AS users FROM user_anime_list GROUP BY anime_id) AS counts
+        WHERE anime.id = counts.anime_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_anime_status_last_synced_at', table_name='anime')
+    op.drop_column('anime', 'sync_priority')
+    op.drop_column('anime', 'last_synced_at')
@@ -0,0 +1,30 @@
+"""add anime (score, id) index for keyset pagination
+
+Revision ID: dffa897047be
+Revises: a1b2c3d4e5f6
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'dffa897047be'
+down_revision: Union[str, Sequence[str], None] = 'a1b2c3d4e5f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # порядок совпадает с ORDER BY каталога: score DESC NULLS LAST, id DESC
+    op.create_index(
+        'ix_anime_score_id',
+        'anime',
+        [sa.text('score DESC NULLS LAST'), sa.text('id DESC')],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_anime_score_id', table_name='anime')
@@ -0,0 +1,26 @@
+"""add anime.content_hash
+
+Revision ID: e73ee77d5e2c
+Revises: c0d5df56f500
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'e73ee77d5e2c'
+down_revision: Union[str, Sequence[str], None] = 'c0d5df56f500'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # NULL у старых строк — первый же ресинк запишет их и проставит хэш
+    op.add_column('anime', sa.Column('content_hash', sa.String(length=32), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('anime', 'content_hash')
@@ -1,29 +1,45 @@
-from fastapi import APIRouter, Depends, status, Query, HTTPException
+from datetime import datetime
 
+from fastapi import APIRouter, Depends, status, Query, HTTPException, Request, Response
+
+from app.config import settings
 from app.dependencies import AnimeRepoDepends, AnimeServiceDepends, JikanDepends
-from app.schemas.anime import AnimeCreate, AnimeResponse, CatalogQuery
+from app.repositories.catalog_cache import CatalogPage, catalog_cache
+from app.schemas.anime import AnimeCreate, AnimeResponse, CatalogQuery, anime_rows_json
 from app.tasks.anime_tasks import sync_anime_task, sync_top_anime_task
+from app.utils.cursor import encode_cursor
+from app.utils.http_cache import cache_headers, is_not_modified, make_etag
 
 router = APIRouter()
 
 
+def _anime_cache_headers(*key: object, updated_at: datetime) -> dict[str, str]:
+    return cache_headers(make_etag('anime', *key, updated_at.isoformat()), settings.anime_cache_max_age)
+
+
+def _not_modified(request: Request, headers: dict[str, str]) -> Response | None:
+    if is_not_modified(request, headers['ETag']):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return None
+
+
 @router.get('/jikan/top', summary='Jikan: Топ Аниме')
 async def top_anime(client: JikanDepends):
-    return await client.get_top_anime(limit=5)
+    return await client.get_top_anime(limit=5, cached=True)
 
 
 @router.get('/jikan/search', summary='Jikan: Поиск')
 async def search_anime(query: str, client: JikanDepends):
-    return await client.search_anime(query=query)
+    return await client.search_anime(query=query, cached=True)
 
 
 @router.get('/jikan/{mal_id}', summary='Jikan: детали по mal id')
 async def get_anime_full(mal_id: int, client: JikanDepends):
-    return await client.get_anime_by_id(mal_id=mal_id)
+    return await client.get_anime_by_id(mal_id=mal_id, cached=True)
 
 
 @router.post('/sync/top', status_code=status.HTTP_202_ACCEPTED)
-async def queue_top_sync(limit: int = Query(25, ge=1, le=100)):
+async def queue_top_sync(limit: int = Query(25, ge=1, le=1000)):
     await sync_top_anime_task.kiq(limit=limit)
     return {"message": f"синхронизация топ {limit} аниме поставлена в очередь"}
 
@@ -36,10 +52,43 @@ async def queue_anime_sync(mal_id: int):
 
 @router.get('/', response_model=list[AnimeResponse], summary='Каталог аниме с фильтрами')
 async def get_catalog(
+    request: Request,
     repo: AnimeRepoDepends,
     query: CatalogQuery = Depends(),
 ):
-    return await repo.get_all(query)
+    if query.search and query.cursor:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='cursor не поддерживается вместе с search, используйте offset',
+        )
+    try:
+        query.cursor_position()
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='некорректный cursor',
+        )
+    # страница зависит только от параметров и версии каталога — 304 без запроса в БД
+    generation = await catalog_cache.generation()
+    etag = make_etag('catalog', generation, sorted(request.query_params.multi_items()))
+    headers = cache_headers(etag, settings.catalog_cache_max_age)
+    not_modified = _not_modified(request, headers)
+    if not_modified is not None:
+        return not_modified
+
+    async def load() -> CatalogPage:
+        rows = await repo.get_all_rows(query)
+        next_cursor = None
+        if len(rows) == query.limit and not query.search:
+            next_cursor = encode_cursor(rows[-1]['score'], rows[-1]['id'])
+        # мимо response_model: строки сразу в JSON через pydantic-core
+        return CatalogPage(body=anime_rows_json.dump_json(rows), next_cursor=next_cursor)
+
+    page = await catalog_cache.get_or_load(generation, query, load)
+    response = Response(content=page.body, media_type='application/json', headers=headers)
+    if page.next_cursor:
+        response.headers['X-Next-Cursor'] = page.next_cursor
+    return response
 
 
 @router.post('/', response_model=AnimeResponse, status_code=status.HTTP_201_CREATED)
@@ -50,16 +99,44 @@ async def create_anime(anime_in: AnimeCreate, repo: AnimeRepoDepends):
 
 
 @router.get('/mal/{mal_id}', response_model=AnimeResponse, summary='Поиск в БД по MAL ID (или fetch из Jikan)')
-async def get_anime_by_mal_id(mal_id: int, service: AnimeServiceDepends):
-    return await service.get_or_fetch_by_mal_id(mal_id)
+async def get_anime_by_mal_id(
+    mal_id: int,
+    request: Request,
+    response: Response,
+    service: AnimeServiceDepends,
+):
+    updated_at = await service.repo.get_updated_at_by_mal_id(mal_id)
+    if updated_at is not None:
+        not_modified = _not_modified(request, _anime_cache_headers('mal', mal_id, updated_at=updated_at))
+        if not_modified is not None:
+            return not_modified
+
+    anime = await service.get_or_fetch_by_mal_id(mal_id)
+    response.headers.update(
+        _anime_cache_headers('mal', mal_id, updated_at=anime.updated_at or anime.created_at)
+    )
+    return anime
 
 
 @router.get('/{anime_id}', response_model=AnimeResponse, summary='поиск по id базы данных')
-async def get_anime_details(anime_id: int, repo: AnimeRepoDepends):
+async def get_anime_details(
+    anime_id: int,
+    request: Request,
+    response: Response,
+    repo: AnimeRepoDepends,
+):
+    # 304 по одной колонке из PK-индекса, тайтл и жанры не грузим
+    updated_at = await repo.get_updated_at(anime_id)
+    if updated_at is not None:
+        not_modified = _not_modified(request, _anime_cache_headers(anime_id, updated_at=updated_at))
+        if not_modified is not None:
+            return not_modified
+
     anime = await repo.get_by_id(anime_id)
     if not anime:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f'аниме не найдено в базе данных по внутреннему {anime_id}',
         )
+    response.headers.update(_anime_cache_headers(anime_id, updated_at=anime.updated_at or anime.created_at))
     return anime
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Request, status
 from fastapi.security import OAuth2PasswordBearer
 
 from app.dependencies import CurrentUser, UserRepoDepends, RedisDependency
@@ -23,11 +23,14 @@ async def register(
 @router.post('/login', response_model=TokenResponse, status_code=status.HTTP_200_OK)
 async def login(
     data: LoginRequest,
+    request: Request,
     user_repo: UserRepoDepends,
     redis: RedisDependency,
 ):
     service = AuthService(user_repo=user_repo, redis=redis)
-    return await service.login(data)
+    # за прокси uvicorn должен быть запущен с --proxy-headers, чтобы тут был IP клиента
+    client_ip = request.client.host if request.client else None
+    return await service.login(data, client_ip=client_ip)
 
 
 @router.post('/logout', status_code=status.HTTP_200_OK)
@@ -42,6 +45,17 @@ async def logout(
     return {"message": "logged out"}
 
 
+@router.post('/deactivate', status_code=status.HTTP_200_OK)
+async def deactivate(
+    current_user: CurrentUser,
+    user_repo: UserRepoDepends,
+    redis: RedisDependency,
+):
+    service = AuthService(user_repo=user_repo, redis=redis)
+    await service.deactivate(user_id=current_user.id)
+    return {"message": "account deactivated"}
+
+
 @router.post('/refresh', response_model=TokenResponse, status_code=status.HTTP_200_OK)
 async def refresh(
     data: RefreshRequest,
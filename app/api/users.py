@@ -1,12 +1,27 @@
-from typing import Optional
+from typing import Literal, Optional
 
-from fastapi import APIRouter, HTTPException, Query, status
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 
-from app.dependencies import AnimeRepoDepends, CurrentUser, UserAnimeListRepoDepends
+from app.dependencies import (
+    AnimeRepoDepends,
+    CurrentUser,
+    ListTransferServiceDepends,
+    RecommendationServiceDepends,
+    UserAnimeListRepoDepends,
+)
 from app.models.user_anime_list import WatchStatus
 from app.schemas.anime import AnimeResponse
 from app.schemas.user import UserResponse
-from app.schemas.user_anime_list import UserAnimeListCreate, UserAnimeListResponse, UserAnimeListUpdate
+from app.schemas.user_anime_list import (
+    ListImportResponse,
+    UserAnimeListCreate,
+    UserAnimeListResponse,
+    UserAnimeListUpdate,
+    list_cursor_position,
+)
+from app.services.list_transfer_service import parse_mal_xml, parse_ndjson
+from app.utils.cursor import encode_cursor
 
 router = APIRouter()
 
@@ -19,19 +34,88 @@ async def get_me(current_user: CurrentUser):
 @router.get('/me/recommendations', response_model=list[AnimeResponse], summary='Рекомендации по топ жанрам из списка')
 async def get_recommendations(
     current_user: CurrentUser,
-    repo: AnimeRepoDepends,
+    recommendations: RecommendationServiceDepends,
     limit: int = Query(10, ge=1, le=50),
 ):
-    return await repo.get_recommendations(user_id=current_user.id, limit=limit)
+    return await recommendations.get_for_user(user_id=current_user.id, limit=limit)
 
 
 @router.get('/me/list', response_model=list[UserAnimeListResponse])
 async def get_my_list(
     current_user: CurrentUser,
     repo: UserAnimeListRepoDepends,
+    response: Response,
     watch_status: Optional[WatchStatus] = Query(None, alias="status"),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description='Курсор следующей страницы из X-Next-Cursor'),
+    stream: bool = Query(False, description='Весь список одним NDJSON-потоком, limit и cursor игнорируются'),
 ):
-    return await repo.get_by_user(user_id=current_user.id, status=watch_status)
+    if stream:
+        async def ndjson():
+            # сессия из get_db живёт до конца отправки ответа
+            async for entry in repo.stream_by_user(user_id=current_user.id, status=watch_status):
+                yield UserAnimeListResponse.model_validate(entry).model_dump_json() + '\n'
+
+        return StreamingResponse(ndjson(), media_type='application/x-ndjson')
+
+    try:
+        after = list_cursor_position(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='некорректный cursor',
+        )
+    items = await repo.get_by_user(user_id=current_user.id, status=watch_status, limit=limit, after=after)
+    if len(items) == limit:
+        response.headers['X-Next-Cursor'] = encode_cursor(items[-1].created_at.isoformat(), items[-1].id)
+    return items
+
+
+@router.post('/me/list/import', response_model=ListImportResponse, summary='Импорт списка: выгрузка MAL (XML) или NDJSON')
+async def import_list(
+    request: Request,
+    current_user: CurrentUser,
+    transfer: ListTransferServiceDepends,
+    recommendations: RecommendationServiceDepends,
+):
+    # JSON-массив не принимаем: файл разбирается потоком, а массив пришлось бы читать целиком
+    media_type = request.headers.get('content-type', '').split(';')[0].strip().lower()
+    if media_type in ('application/xml', 'text/xml'):
+        entries = parse_mal_xml(request.stream())
+    elif media_type == 'application/x-ndjson':
+        entries = parse_ndjson(request.stream())
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail='ожидается application/xml или application/x-ndjson',
+        )
+    try:
+        result = await transfer.import_entries(user_id=current_user.id, entries=entries)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f'не удалось разобрать файл: {e}',
+        )
+    finally:
+        await recommendations.invalidate(current_user.id)
+    return result
+
+
+@router.get('/me/list/export', summary='Экспорт списка потоком: выгрузка MAL (XML) или NDJSON')
+async def export_list(
+    current_user: CurrentUser,
+    transfer: ListTransferServiceDepends,
+    fmt: Literal['xml', 'ndjson'] = Query('xml', alias='format'),
+):
+    if fmt == 'xml':
+        body, media_type = transfer.export_mal_xml(current_user.id), 'application/xml'
+    else:
+        body, media_type = transfer.export_ndjson(current_user.id), 'application/x-ndjson'
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={'Content-Disposition': f'attachment; filename="animelist.{fmt}"'},
+    )
 
 
 @router.post('/me/list', response_model=UserAnimeListResponse, status_code=status.HTTP_201_CREATED)
@@ -40,6 +124,7 @@ async def add_to_list(
     current_user: CurrentUser,
     repo: UserAnimeListRepoDepends,
     anime_repo: AnimeRepoDepends,
+    recommendations: RecommendationServiceDepends,
 ):
     if await repo.exists(current_user.id, data.anime_id):
         raise HTTPException(
@@ -51,7 +136,9 @@ async def add_to_list(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Аниме не найдено в базе данных",
         )
-    return await repo.add(user_id=current_user.id, data=data)
+    entry = await repo.add(user_id=current_user.id, data=data)
+    await recommendations.invalidate(current_user.id)
+    return entry
 
 
 @router.patch('/me/list/{anime_id}', response_model=UserAnimeListResponse)
@@ -60,6 +147,7 @@ async def update_in_list(
     data: UserAnimeListUpdate,
     current_user: CurrentUser,
     repo: UserAnimeListRepoDepends,
+    recommendations: RecommendationServiceDepends,
 ):
     if not data.model_dump(exclude_unset=True):
         raise HTTPException(
@@ -72,6 +160,7 @@ async def update_in_list(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Аниме не найдено в вашем списке",
         )
+    await recommendations.invalidate(current_user.id)
     return entry
 
 
@@ -80,6 +169,7 @@ async def delete_from_list(
     anime_id: int,
     current_user: CurrentUser,
     repo: UserAnimeListRepoDepends,
+    recommendations: RecommendationServiceDepends,
 ):
     deleted = await repo.delete(user_id=current_user.id, anime_id=anime_id)
     if not deleted:
@@ -87,3 +177,4 @@ async def delete_from_list(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Аниме не найдено в вашем списке",
         )
+    await recommendations.invalidate(current_user.id)
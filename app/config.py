@@ -6,8 +6,53 @@ class Settings(BaseSettings):
     redis_url: str = "redis://localhost:6379"
     jwt_secret: str
     jwt_algorithm: str = "HS256"
+    # RS256/EdDSA: приватный ключ в PEM, публичный уходит в JWKS под этим kid
+    jwt_private_key_path: str | None = None
+    jwt_key_id: str = "anisync-1"
+    # LRU проверенных токенов в воркере
+    jwt_decode_cache_size: int = 10_000
     access_token_expire_minutes: int = 15
     refresh_token_expire_days: int = 7
+    # bcrypt: cost (при смене хэши пересчитываются на логине), пул потоков и предел очереди
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 0  # 0 — min(4, число CPU)
+    password_hash_max_pending: int = 64
+    # троттлинг логина: попыток с IP / неудач на email за окно (сек), блокировка удваивается до max
+    login_ip_limit: int = 30
+    login_ip_window: int = 60
+    login_email_limit: int = 5
+    login_email_window: int = 15 * 60
+    login_lockout_base: int = 30
+    login_lockout_max: int = 60 * 60
+    # Jikan: 3 req/s и 60 req/min — держим 1 req/s с burst до 3
+    jikan_rate_limit: float = 1.0
+    jikan_rate_burst: int = 3
+    # TTL кэша ответов Jikan для /anime/jikan/*, секунды
+    jikan_cache_top_ttl: int = 24 * 60 * 60
+    jikan_cache_full_ttl: int = 3 * 24 * 60 * 60
+    jikan_cache_search_ttl: int = 10 * 60
+    # item-item рекомендации: файл индекса общий для воркера сборки и API
+    item_similarity_path: str = "data/item_similarity.npy"
+    item_similarity_top_k: int = 50
+    # кэш принципала в get_current_user: Redis и локальная копия в воркере, секунды
+    user_cache_ttl: int = 5 * 60
+    user_cache_local_ttl: int = 30
+    # Cache-Control max-age для каталога и карточки тайтла, секунды (ETag позволяет ревалидировать)
+    catalog_cache_max_age: int = 60
+    anime_cache_max_age: int = 5 * 60
+    # страницы каталога в Redis; инвалидируются поколением, TTL только чистит старые
+    catalog_page_cache_ttl: int = 10 * 60
+    # метрики горячих путей копятся в памяти воркера и уходят в Redis раз в столько секунд
+    metrics_flush_interval: float = 5.0
+    # планировщик: через сколько часов тайтл считается устаревшим, по статусу
+    sync_stale_airing_hours: int = 6
+    sync_stale_upcoming_hours: int = 24
+    sync_stale_finished_hours: int = 30 * 24
+    # сколько тайтлов за прогон (раз в 10 минут) — треть бюджета Jikan при 1 req/s,
+    # остальное остаётся на пользовательские промахи и топ
+    sync_budget_per_run: int = 200
+    # аренда тайтла, взятого в работу: не синкнулся за это время — снова в очереди, минуты
+    sync_claim_lease_minutes: int = 15
 
     model_config = SettingsConfigDict(
         env_file='.env',
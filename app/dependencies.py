@@ -7,11 +7,14 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
 from app.external.jikan_client import JikanClient
-from app.models.user import User
 from app.repositories.anime_repo import AnimeRepository
+from app.repositories.token_blacklist import token_blacklist
 from app.repositories.user_anime_list_repo import UserAnimeListRepository
+from app.repositories.user_cache import UserPrincipal, user_cache
 from app.repositories.user_repo import UserRepository
 from app.services.anime_service import AnimeService
+from app.services.list_transfer_service import ListTransferService
+from app.services.recommendation_service import RecommendationService
 from app.utils.jwt import decode_token
 
 
@@ -54,7 +57,7 @@ async def get_current_user(
     token: Annotated[str, Depends(oauth2_scheme)],
     user_repo: Annotated[UserRepository, Depends(get_user_repo)],
     redis: Annotated[Redis, Depends(get_redis)],
-):
+) -> UserPrincipal:
     payload = decode_token(token)
 
     if payload.get("type") != "access":
@@ -65,7 +68,7 @@ async def get_current_user(
         )
 
     jti: str = payload["jti"]
-    if await redis.exists(f"blacklist:{jti}"):
+    if await token_blacklist.is_revoked(jti, redis, session_id=payload.get("sid")):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token has been revoked",
@@ -73,7 +76,11 @@ async def get_current_user(
         )
 
     user_id = int(payload["sub"])
-    user = await user_repo.get_by_id(user_id)
+    user = await user_cache.get(user_id)
+    if user is None:
+        user = await user_repo.get_principal(user_id)
+        if user is not None:
+            await user_cache.set(user)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -101,14 +108,32 @@ def get_user_anime_list_repo(
 def get_anime_service(
     repo: Annotated[AnimeRepository, Depends(get_anime_repo)],
     jikan: Annotated[JikanClient, Depends(get_jikan_client)],
+    redis: Annotated[Redis, Depends(get_redis)],
 ) -> AnimeService:
-    return AnimeService(repo=repo, jikan=jikan)
+    return AnimeService(repo=repo, jikan=jikan, redis=redis)
+
+
+def get_recommendation_service(
+    repo: Annotated[AnimeRepository, Depends(get_anime_repo)],
+    list_repo: Annotated[UserAnimeListRepository, Depends(get_user_anime_list_repo)],
+    redis: Annotated[Redis, Depends(get_redis)],
+) -> RecommendationService:
+    return RecommendationService(repo=repo, list_repo=list_repo, redis=redis)
+
+
+def get_list_transfer_service(
+    list_repo: Annotated[UserAnimeListRepository, Depends(get_user_anime_list_repo)],
+    anime_repo: Annotated[AnimeRepository, Depends(get_anime_repo)],
+) -> ListTransferService:
+    return ListTransferService(list_repo=list_repo, anime_repo=anime_repo)
 
 
 AnimeRepoDepends = Annotated[AnimeRepository, Depends(get_anime_repo)]
 JikanDepends = Annotated[JikanClient, Depends(get_jikan_client)]
 UserRepoDepends = Annotated[UserRepository, Depends(get_user_repo)]
 RedisDependency = Annotated[Redis, Depends(get_redis)]
-CurrentUser = Annotated[User, Depends(get_current_user)]
+CurrentUser = Annotated[UserPrincipal, Depends(get_current_user)]
 UserAnimeListRepoDepends = Annotated[UserAnimeListRepository, Depends(get_user_anime_list_repo)]
 AnimeServiceDepends = Annotated[AnimeService, Depends(get_anime_service)]
+RecommendationServiceDepends = Annotated[RecommendationService, Depends(get_recommendation_service)]
+ListTransferServiceDepends = Annotated[ListTransferService, Depends(get_list_transfer_service)]
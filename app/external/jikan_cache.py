@@ -0,0 +1,143 @@
+import asyncio
+import enum
+import json
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+from urllib.parse import urlencode
+
+import httpx
+import structlog
+from redis.asyncio import Redis
+from tenacity import RetryError
+
+from app.config import settings
+from app.utils import metrics
+
+logger = structlog.get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    ttl: int  # сколько секунд ответ считается свежим
+    stale_ttl: int  # сколько ещё можно отдавать устаревший ответ, обновляя его в фоне
+
+
+POLICIES: dict[str, CachePolicy] = {
+    'top': CachePolicy(ttl=settings.jikan_cache_top_ttl, stale_ttl=settings.jikan_cache_top_ttl),
+    'full': CachePolicy(ttl=settings.jikan_cache_full_ttl, stale_ttl=settings.jikan_cache_full_ttl),
+    'search': CachePolicy(ttl=settings.jikan_cache_search_ttl, stale_ttl=settings.jikan_cache_search_ttl),
+}
+
+Fetcher = Callable[[str, dict[str, Any], dict[str, str]], Awaitable[httpx.Response]]
+
+
+def normalize_params(params: dict[str, Any]) -> dict[str, Any]:
+    """Убирает пустые значения, enum -> value, строки приводит к единому виду."""
+    normalized: dict[str, Any] = {}
+    for name, value in sorted(params.items()):
+        if value is None:
+            continue
+        if isinstance(value, enum.Enum):
+            value = value.value
+        if isinstance(value, str):
+            value = value.strip().lower()
+        normalized[name] = value
+    return normalized
+
+
+class JikanResponseCache:
+    """Read-through кэш JSON-ответов Jikan в Redis.
+
+    Свежий ответ отдаётся сразу, устаревший (в пределах stale_ttl) — тоже,
+    но параллельно обновляется в фоне. Повторная загрузка идёт с If-None-Match,
+    так что неизменившийся ответ стоит Jikan'у только 304.
+    """
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+        self._background: set[asyncio.Task] = set()
+
+    async def get(
+        self,
+        policy_name: str,
+        endpoint: str,
+        params: dict[str, Any],
+        fetch: Fetcher,
+    ) -> Any:
+        policy = POLICIES[policy_name]
+        key = f'jikan:cache:{endpoint}?{urlencode(params)}'
+
+        raw = await self.redis.get(key)
+        entry = json.loads(raw) if raw else None
+        if entry is not None:
+            age = time.time() - entry['fetched_at']
+            if age < policy.ttl:
+                await metrics.incr(self.redis, 'jikan_cache', f'{policy_name}:hit')
+                return entry['body']
+            if age < policy.ttl + policy.stale_ttl:
+                await metrics.incr(self.redis, 'jikan_cache', f'{policy_name}:stale')
+                await self._revalidate_in_background(key, policy, endpoint, params, entry, fetch)
+                return entry['body']
+
+        await metrics.incr(self.redis, 'jikan_cache', f'{policy_name}:miss')
+        entry = await self._revalidate(key, policy, endpoint, params, entry, fetch)
+        return entry['body']
+
+    async def _revalidate(
+        self,
+        key: str,
+        policy: CachePolicy,
+        endpoint: str,
+        params: dict[str, Any],
+        entry: dict | None,
+        fetch: Fetcher,
+    ) -> dict:
+        headers = {}
+        if entry is not None and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+
+        response = await fetch(endpoint, params, headers)
+        if response.status_code == httpx.codes.NOT_MODIFIED and entry is not None:
+            await metrics.incr(self.redis, 'jikan_cache', 'not_modified')
+            entry['fetched_at'] = time.time()
+        else:
+            entry = {
+                'body': response.json(),
+                'etag': response.headers.get('etag'),
+                'fetched_at': time.time(),
+            }
+
+        # храним дольше окна stale, чтобы после него ещё можно было ревалидировать по ETag
+        await self.redis.set(key, json.dumps(entry), ex=(policy.ttl + policy.stale_ttl) * 2)
+        return entry
+
+    async def _revalidate_in_background(
+        self,
+        key: str,
+        policy: CachePolicy,
+        endpoint: str,
+        params: dict[str, Any],
+        entry: dict,
+        fetch: Fetcher,
+    ) -> None:
+        # один фоновый запрос на ключ на все воркеры
+        if not await self.redis.set(f'{key}:lock', 1, nx=True, ex=30):
+            return
+
+        async def run() -> None:
+            try:
+                await self._revalidate(key, policy, endpoint, params, entry, fetch)
+            except (httpx.HTTPError, RetryError):
+                # остаёмся на устаревшем ответе до следующей попытки
+                logger.warning("jikan_revalidate_failed", key=key, exc_info=True)
+            finally:
+                await self.redis.delete(f'{key}:lock')
+
+        task = asyncio.create_task(run())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def close(self) -> None:
+        for task in list(self._background):
+            task.cancel()
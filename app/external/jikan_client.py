@@ -1,50 +1,94 @@
+from typing import Any
+
 import httpx
 from aiolimiter import AsyncLimiter
+from redis.asyncio import Redis
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from app.config import settings
+from app.external.jikan_cache import JikanResponseCache, normalize_params
+from app.external.rate_limiter import RedisTokenBucket
 from app.models.anime import AnimeSeason, AnimeStatus
 
+# Jikan отдаёт максимум 25 элементов на страницу
+JIKAN_PAGE_SIZE = 25
+
 
 class JikanClient:
-    def __init__(self):
+    def __init__(self, redis: Redis | None = None):
         self.base_url = 'https://api.jikan.moe/v4'
         self.client = httpx.AsyncClient(timeout=10.0)
-        self.rate_limiter = AsyncLimiter(3, 1)
+        # С Redis лимит общий на все процессы; без него (тесты, скрипты) — локальный
+        self.rate_limiter: RedisTokenBucket | AsyncLimiter
+        self.cache: JikanResponseCache | None = None
+        if redis is not None:
+            self.cache = JikanResponseCache(redis)
+            self.rate_limiter = RedisTokenBucket(
+                redis,
+                key='ratelimit:jikan',
+                rate=settings.jikan_rate_limit,
+                capacity=settings.jikan_rate_burst,
+            )
+        else:
+            self.rate_limiter = AsyncLimiter(
+                settings.jikan_rate_burst,
+                settings.jikan_rate_burst / settings.jikan_rate_limit,
+            )
 
     @retry(
             stop=stop_after_attempt(5),
             wait=wait_exponential(multiplier=1, min=2, max=10),
             retry=retry_if_exception_type(httpx.HTTPStatusError)
     )
-    async def _request(self, method: str, endpoint: str, **kwargs):
+    async def _send(self, method: str, endpoint: str, **kwargs) -> httpx.Response:
         async with self.rate_limiter:
             url = f'{self.base_url}/{endpoint}'
             response = await self.client.request(method, url, **kwargs)
-            response.raise_for_status()
-            return response.json()
-    
-    async def get_top_anime(self, limit: int = 10):
-        data = await self._request('GET', 'top/anime', params={'limit': limit})
+            if response.status_code != httpx.codes.NOT_MODIFIED:
+                response.raise_for_status()
+            return response
+
+    async def _request(self, method: str, endpoint: str, **kwargs):
+        response = await self._send(method, endpoint, **kwargs)
+        return response.json()
+
+    async def _get(self, endpoint: str, params: dict[str, Any] | None = None, cache_policy: str | None = None):
+        """GET к Jikan; с cache_policy ответ берётся через Redis-кэш (см. jikan_cache.POLICIES)."""
+        params = normalize_params(params or {})
+        if cache_policy is None or self.cache is None:
+            return await self._request('GET', endpoint, params=params)
+
+        async def fetch(endpoint: str, params: dict[str, Any], headers: dict[str, str]) -> httpx.Response:
+            return await self._send('GET', endpoint, params=params, headers=headers)
+
+        return await self.cache.get(cache_policy, endpoint, params, fetch)
+
+    async def get_top_anime(self, limit: int = 10, page: int = 1, cached: bool = False):
+        data = await self._get(
+            'top/anime',
+            params={'limit': limit, 'page': page},
+            cache_policy='top' if cached else None,
+        )
         return data['data']
-    
 
-    async def get_anime_by_id(self, mal_id: int):
-        data = await self._request('GET', f'anime/{mal_id}/full')
+    async def get_anime_by_id(self, mal_id: int, cached: bool = False):
+        data = await self._get(f'anime/{mal_id}/full', cache_policy='full' if cached else None)
         return data['data']
 
     async def search_anime(
-            self, 
+            self,
             query: str,
-            page: int = 1, 
+            page: int = 1,
             limit: int = 25,
             type: str | None = None,
             status: AnimeStatus | None = None,
             season: AnimeSeason | None = None,
-            order_by: str | None = 'scored_by'):
+            order_by: str | None = 'scored_by',
+            cached: bool = False):
         params = {'q': query, 'page': page, 'limit': limit, 'type': type, 'status': status, 'order_by' : order_by, 'season': season}
-        data = await self._request('GET', 'anime', params=params)
+        data = await self._get('anime', params=params, cache_policy='search' if cached else None)
         return data['data']
-    
-    
 
     async def close(self):
+        if self.cache is not None:
+            await self.cache.close()
         await self.client.aclose()
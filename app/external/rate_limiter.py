@@ -0,0 +1,60 @@
+import asyncio
+
+from redis.asyncio import Redis
+
+# Token bucket целиком внутри Redis: пополнение, списание и расчёт ожидания
+# выполняются атомарно. Время берётся из Redis (TIME), чтобы расхождение часов
+# между контейнерами не влияло на лимит.
+# Возвращает 0, если токен выдан, иначе сколько миллисекунд подождать.
+_TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil or ts == nil then
+    tokens = capacity
+    ts = now
+end
+
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate / 1000)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = math.ceil((1 - tokens) * 1000 / rate)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity * 1000 / rate) + 1000)
+return wait
+"""
+
+
+class RedisTokenBucket:
+    """Общий для всех процессов лимитер (uvicorn-воркеры + taskiq-воркеры).
+
+    Совместим с aiolimiter.AsyncLimiter по интерфейсу `async with limiter:`.
+    """
+
+    def __init__(self, redis: Redis, key: str, rate: float, capacity: int):
+        self.key = key
+        self.rate = rate
+        self.capacity = capacity
+        self._script = redis.register_script(_TOKEN_BUCKET_LUA)
+
+    async def acquire(self) -> None:
+        while True:
+            wait_ms = int(await self._script(keys=[self.key], args=[self.rate, self.capacity]))
+            if wait_ms <= 0:
+                return
+            await asyncio.sleep(wait_ms / 1000)
+
+    async def __aenter__(self) -> None:
+        await self.acquire()
+
+    async def __aexit__(self, *exc_info) -> None:
+        return None
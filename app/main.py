@@ -1,12 +1,21 @@
 from contextlib import asynccontextmanager
 
 import redis.asyncio as aioredis
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 
 from app.config import settings
+from app.database import AsyncSessionLocal
 from app.external.jikan_client import JikanClient
+from app.repositories.catalog_cache import catalog_cache
+from app.repositories.genre_cache import genre_cache
+from app.repositories.token_blacklist import token_blacklist
+from app.repositories.user_cache import user_cache
+from app.services.password_hasher import password_hasher
 from app.tasks.broker import broker
+from app.utils import metrics
+from app.utils.jwt import jwks
 import app.tasks.anime_tasks  # noqa: F401
+import app.tasks.list_tasks  # noqa: F401
 from app.api import anime, auth, users
 
 
@@ -14,14 +23,25 @@ from app.api import anime, auth, users
 async def lifespan(app: FastAPI):
     await broker.startup()
 
-    jikan_client = JikanClient()
-    app.state.jikan_client = jikan_client
-
     redis_client = aioredis.from_url(settings.redis_url)
     app.state.redis = redis_client
 
+    jikan_client = JikanClient(redis=redis_client)
+    app.state.jikan_client = jikan_client
+
+    await genre_cache.start(redis_client, AsyncSessionLocal)
+    await user_cache.start(redis_client)
+    await token_blacklist.start(redis_client)
+    await catalog_cache.start(redis_client)
+    await password_hasher.start(redis_client)
+
     yield
 
+    await password_hasher.stop()
+    await catalog_cache.stop()
+    await token_blacklist.stop()
+    await user_cache.stop()
+    await genre_cache.stop()
     await jikan_client.close()
     await redis_client.aclose()
     await broker.shutdown()
@@ -41,3 +61,14 @@ app.include_router(users.router, prefix='/users', tags=['Users'])
 @app.get('/health')
 async def status():
     return {'status': 'AniSync онлайн!'}
+
+
+@app.get('/metrics')
+async def get_metrics():
+    return await metrics.snapshot(app.state.redis)
+
+
+@app.get('/.well-known/jwks.json')
+async def get_jwks(response: Response):
+    response.headers['Cache-Control'] = 'public, max-age=3600'
+    return jwks()
@@ -2,4 +2,5 @@ from .base import Base
 from .anime import Anime
 from .genre import Genre, anime_genres
 from .user import User
-from .user_anime_list import UserAnimeList
\ No newline at end of file
+from .user_anime_list import UserAnimeList
+from .user_genre_affinity import UserGenreAffinity
@@ -1,4 +1,5 @@
-from sqlalchemy import Text
+from sqlalchemy import Computed, Index, String, Text, func
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.types import DateTime
 from app.models.base import Base
@@ -6,6 +7,14 @@ from datetime import datetime, timezone
 import enum
 
 
+# Заголовки с весом A/B без стемминга, описание — C с английским стеммингом
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(title_english, '')), 'A') "
+    "|| setweight(to_tsvector('simple', coalesce(title_japanese, '')), 'B') "
+    "|| setweight(to_tsvector('english', coalesce(synopsis, '')), 'C')"
+)
+
+
 class AnimeStatus(enum.Enum):
     AIRING = 'airing'
     FINISHED = 'finished'
@@ -32,6 +41,11 @@ class Anime(Base):
     season: Mapped[AnimeSeason] = mapped_column(nullable=True)
     year: Mapped[int] = mapped_column(nullable=True)
     image_url: Mapped[str] = mapped_column(nullable=True)
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(SEARCH_VECTOR, persisted=True),
+        nullable=True,
+        deferred=True)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         default=lambda: datetime.now(timezone.utc),
@@ -40,10 +54,43 @@ class Anime(Base):
         DateTime(timezone=True),
         default=lambda: datetime.now(timezone.utc), 
         onupdate=lambda: datetime.now(timezone.utc))
+    # когда тайтл последний раз успешно тянули из Jikan
+    last_synced_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
+    # когда планировщик взял тайтл в работу: короткая аренда, чтобы параллельный прогон его не взял,
+    # а неудачный fetch вернулся в очередь по её истечении, а не через весь срок устаревания
+    sync_claimed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
+    # сколько пользователей держат тайтл в списке — популярные обновляются первыми
+    sync_priority: Mapped[int] = mapped_column(default=0, server_default='0', nullable=False)
+    # хэш нормализованного ответа Jikan (поля + жанры): совпал — ресинк ничего не пишет
+    content_hash: Mapped[str] = mapped_column(String(32), nullable=True)
     
     genres: Mapped[list['Genre']] = relationship(
         'Genre',
         secondary='anime_genres', 
         back_populates='animes',
-        lazy='selectin'
-    )
\ No newline at end of file
+        lazy='raise'
+    )
+
+
+# keyset-пагинация каталога: ORDER BY score DESC NULLS LAST, id DESC
+Index('ix_anime_score_id', Anime.score.desc().nulls_last(), Anime.id.desc())
+
+# фильтры каталога + тот же порядок, чтобы план обходился без Sort
+Index('ix_anime_status_score_id', Anime.status, Anime.score.desc().nulls_last(), Anime.id.desc())
+Index('ix_anime_year_season_score_id', Anime.year, Anime.season, Anime.score.desc().nulls_last(), Anime.id.desc())
+Index('ix_anime_year_score_id', Anime.year, Anime.score.desc().nulls_last(), Anime.id.desc())
+Index('ix_anime_season_score_id', Anime.season, Anime.score.desc().nulls_last(), Anime.id.desc())
+
+# поиск: GIN по tsvector и trigram-индексы, на которых работает ILIKE '%q%'
+Index('ix_anime_search_vector', Anime.search_vector, postgresql_using='gin')
+Index('ix_anime_title_trgm', Anime.title, postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'})
+Index('ix_anime_title_english_trgm', Anime.title_english, postgresql_using='gin', postgresql_ops={'title_english': 'gin_trgm_ops'})
+Index('ix_anime_title_japanese_trgm', Anime.title_japanese, postgresql_using='gin', postgresql_ops={'title_japanese': 'gin_trgm_ops'})
+
+# планировщик синхронизации: то же выражение давности синка, что в claim_stale, по статусу
+Index(
+    'ix_anime_status_last_synced',
+    Anime.status,
+    func.coalesce(Anime.last_synced_at, Anime.updated_at, Anime.created_at),
+    postgresql_where=Anime.mal_id.is_not(None),
+)
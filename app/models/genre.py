@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, Integer, String, Table
+from sqlalchemy import Column, ForeignKey, Index, Integer, String, Table
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.models.base import Base
 from typing import Optional
@@ -7,7 +7,9 @@ anime_genres = Table(
     'anime_genres',
     Base.metadata,
     Column('anime_id', Integer, ForeignKey('anime.id', ondelete='CASCADE'), primary_key=True),
-    Column('genre_id', Integer, ForeignKey('genre.id', ondelete='CASCADE'), primary_key=True)
+    Column('genre_id', Integer, ForeignKey('genre.id', ondelete='CASCADE'), primary_key=True),
+    # фильтр каталога по жанру идёт от genre_id, PK (anime_id, genre_id) тут не помогает
+    Index('ix_anime_genres_genre_id', 'genre_id', 'anime_id'),
 )
 
 class Genre(Base):
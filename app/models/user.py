@@ -33,5 +33,6 @@ class User(Base):
         "UserAnimeList",
         back_populates="user",
         cascade="all, delete-orphan",
-        lazy="selectin"
+        passive_deletes=True,
+        lazy="raise"
     )
@@ -1,7 +1,7 @@
 from __future__ import annotations
 import enum
 from typing import TYPE_CHECKING
-from sqlalchemy import Enum as SAEnum, ForeignKey, Integer, UniqueConstraint, CheckConstraint
+from sqlalchemy import Enum as SAEnum, ForeignKey, Index, Integer, UniqueConstraint, CheckConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.types import DateTime
 from app.models.base import Base
@@ -32,8 +32,7 @@ class UserAnimeList(Base):
     id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[int] = mapped_column(
         ForeignKey('users.id', ondelete='CASCADE'),
-        nullable=False,
-        index=True
+        nullable=False
     )
     anime_id: Mapped[int] = mapped_column(
         ForeignKey('anime.id', ondelete='CASCADE'),
@@ -59,4 +58,8 @@ class UserAnimeList(Base):
     )
 
     user: Mapped["User"] = relationship("User", back_populates="anime_list")
-    anime: Mapped["Anime"] = relationship("Anime", lazy="selectin")
+    anime: Mapped["Anime"] = relationship("Anime", lazy="raise")
+
+
+# список пользователя: фильтр по user_id, порядок и keyset по (created_at, id)
+Index('ix_user_anime_list_user_created_id', UserAnimeList.user_id, UserAnimeList.created_at.desc(), UserAnimeList.id.desc())
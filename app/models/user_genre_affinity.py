@@ -0,0 +1,22 @@
+from sqlalchemy import Float, ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column
+from app.models.base import Base
+
+
+class UserGenreAffinity(Base):
+    """Накопленный вес жанра для пользователя; поддерживается инкрементально при изменении списка."""
+    __tablename__ = 'user_genre_affinity'
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE'),
+        primary_key=True
+    )
+    genre_id: Mapped[int] = mapped_column(
+        ForeignKey('genre.id', ondelete='CASCADE'),
+        primary_key=True
+    )
+    weight: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+
+
+# топ жанров пользователя — один index range scan
+Index('ix_user_genre_affinity_user_weight', UserGenreAffinity.user_id, UserGenreAffinity.weight.desc())
@@ -1,17 +1,48 @@
+from datetime import datetime, timedelta, timezone
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, exists, delete, insert, func, or_
+from sqlalchemy import Select, and_, select, update, exists, delete, func, literal_column, or_, tuple_
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert as pg_insert
 from sqlalchemy.engine import CursorResult
-from app.models.anime import Anime
+from app.config import settings
+from app.models.anime import Anime, AnimeStatus
 from app.models.genre import Genre, anime_genres
 from app.schemas.anime import AnimeCreate, AnimeUpdate, CatalogQuery
-from app.repositories.genre_repo import GenreRepository
-from typing import Optional, cast, TypedDict
+from app.repositories.catalog_cache import catalog_cache
+from app.repositories.genre_cache import genre_cache
+from app.repositories.genre_repo import GenreInput, GenreRepository
+from app.repositories.loaders import CATALOG_WITH_GENRES
+from app.repositories.user_anime_list_repo import UserAnimeListRepository
+from typing import Any, Optional, cast
+
+# Колонки AnimeResponse для быстрого пути каталога: строки вместо ORM-объектов,
+# жанры одним json_agg на тайтл прямо в том же запросе
+_CATALOG_COLUMNS = (
+    Anime.id, Anime.mal_id, Anime.title, Anime.title_english, Anime.title_japanese,
+    Anime.synopsis, Anime.score, Anime.episodes, Anime.status, Anime.season,
+    Anime.year, Anime.image_url, Anime.created_at, Anime.updated_at,
+)
+_GENRES_JSON = (
+    select(
+        func.coalesce(
+            func.json_agg(
+                aggregate_order_by(
+                    func.json_build_object('id', Genre.id, 'name', Genre.name, 'mal_id', Genre.mal_id),
+                    Genre.id,
+                )
+            ),
+            literal_column("'[]'::json"),
+        )
+    )
+    .select_from(anime_genres.join(Genre, Genre.id == anime_genres.c.genre_id))
+    .where(anime_genres.c.anime_id == Anime.id)
+    .scalar_subquery()
+    .label('genres')
+)
 
-class GenreInput(TypedDict):
-    name: str
-    mal_id: Optional[int]
 
 class AnimeRepository:
+    _last_modified = func.coalesce(Anime.updated_at, Anime.created_at)
+
     def __init__(self, session: AsyncSession):
         self.session = session
         self.genre_repo = GenreRepository(session)
@@ -20,30 +51,63 @@ class AnimeRepository:
         data_dict = anime_data.model_dump(exclude_unset=True)
         anime = Anime(**data_dict)
         self.session.add(anime)
+        await self.session.flush()
+        anime_id = anime.id
         await self.session.commit()
-        await self.session.refresh(anime)
-        return anime
+        await catalog_cache.invalidate()
+        return cast(Anime, await self.get_by_id(anime_id))
     
     async def get_by_id(self, anime_id: int) -> Optional[Anime]:
-        stmt = select(Anime).where(Anime.id == anime_id)
+        stmt = select(Anime).options(*CATALOG_WITH_GENRES).where(Anime.id == anime_id)
         result = await self.session.scalars(stmt)
         return result.one_or_none()
     
     async def get_by_mal_id(self, mal_id: int) -> Optional[Anime]:
-        stmt = select(Anime).where(Anime.mal_id == mal_id)
+        stmt = select(Anime).options(*CATALOG_WITH_GENRES).where(Anime.mal_id == mal_id)
         result = await self.session.scalars(stmt)
         return result.one_or_none()
     
-    async def get_all(self, query: CatalogQuery) -> list[Anime]:
-        stmt = select(Anime)
+    async def get_updated_at(self, anime_id: int) -> Optional[datetime]:
+        """Только время последнего изменения — для ETag, без загрузки тайтла."""
+        return await self.session.scalar(select(self._last_modified).where(Anime.id == anime_id))
+
+    async def get_updated_at_by_mal_id(self, mal_id: int) -> Optional[datetime]:
+        return await self.session.scalar(select(self._last_modified).where(Anime.mal_id == mal_id))
+
+    async def get_content_hashes(self, mal_ids: list[int]) -> dict[int, tuple[int, Optional[str]]]:
+        """mal_id -> (id, content_hash) для пачки одним запросом."""
+        if not mal_ids:
+            return {}
+        result = await self.session.execute(
+            select(Anime.mal_id, Anime.id, Anime.content_hash).where(Anime.mal_id.in_(mal_ids))
+        )
+        return {mal_id: (anime_id, content_hash) for mal_id, anime_id, content_hash in result.all()}
+
+    async def get_ids_by_mal_ids(self, mal_ids: set[int]) -> dict[int, int]:
+        """mal_id -> id для тайтлов, которые уже есть в базе."""
+        if not mal_ids:
+            return {}
+        result = await self.session.execute(select(Anime.mal_id, Anime.id).where(Anime.mal_id.in_(mal_ids)))
+        return {mal_id: anime_id for mal_id, anime_id in result.all()}
+
+    def _catalog_select(self, query: CatalogQuery, stmt: Select[Any]) -> Select[Any]:
 
         if query.genre:
-            genre_subq = (
-                select(anime_genres.c.anime_id)
-                .join(Genre, Genre.id == anime_genres.c.genre_id)
-                .where(Genre.name.ilike(f"%{query.genre}%"))
-                .scalar_subquery()
-            )
+            genre_ids = genre_cache.match_name(query.genre)
+            if genre_ids is not None:
+                # жанр резолвится в памяти, в БД идём только по целочисленным id
+                genre_subq = (
+                    select(anime_genres.c.anime_id)
+                    .where(anime_genres.c.genre_id.in_(genre_ids))
+                    .scalar_subquery()
+                )
+            else:
+                genre_subq = (
+                    select(anime_genres.c.anime_id)
+                    .join(Genre, Genre.id == anime_genres.c.genre_id)
+                    .where(Genre.name.ilike(f"%{query.genre}%"))
+                    .scalar_subquery()
+                )
             stmt = stmt.where(Anime.id.in_(genre_subq))
 
         if query.status is not None:
@@ -59,28 +123,97 @@ class AnimeRepository:
             stmt = stmt.where(Anime.score >= query.min_score)
 
         if query.search:
+            # ILIKE по названиям идёт через trigram-индексы, описание — через tsvector
             pattern = f"%{query.search}%"
             stmt = stmt.where(
                 or_(
                     Anime.title.ilike(pattern),
                     Anime.title_english.ilike(pattern),
+                    Anime.title_japanese.ilike(pattern),
+                    Anime.search_vector.op('@@')(self._search_tsquery(query.search)),
                 )
             )
 
-        stmt = stmt.order_by(Anime.score.desc().nulls_last()).limit(query.limit).offset(query.offset)
-        result = await self.session.scalars(stmt)
-        return list(result.all())
+        return stmt
+
+    @staticmethod
+    def _search_tsquery(search: str):
+        # titles индексируются без стемминга, synopsis — с английским, ищем в обоих вариантах
+        return func.websearch_to_tsquery('simple', search).op('||')(
+            func.websearch_to_tsquery('english', search)
+        )
+
+    @classmethod
+    def _search_rank(cls, search: str):
+        return func.greatest(
+            func.ts_rank(Anime.search_vector, cls._search_tsquery(search)),
+            func.similarity(Anime.title, search),
+            func.similarity(func.coalesce(Anime.title_english, ''), search),
+            func.similarity(func.coalesce(Anime.title_japanese, ''), search),
+        )
+
+    async def get_all_rows(self, query: CatalogQuery) -> list[dict[str, Any]]:
+        """Страница каталога строками с колонками AnimeResponse и genres в JSON, без ORM-объектов."""
+        stmt = self._catalog_select(query, select(*_CATALOG_COLUMNS, _GENRES_JSON))
+        order = (Anime.score.desc().nulls_last(), Anime.id.desc())
+
+        if query.search:
+            # по релевантности курсор (score, id) неприменим — только offset
+            stmt = (
+                stmt.order_by(self._search_rank(query.search).desc(), *order)
+                .limit(query.limit)
+                .offset(query.offset)
+            )
+            return await self._fetch_dicts(stmt)
+
+        position = query.cursor_position()
+        if position is None:
+            stmt = stmt.order_by(*order).limit(query.limit).offset(query.offset)
+            return await self._fetch_dicts(stmt)
+
+        # Keyset: сначала оставшиеся строки с оценкой, потом NULL-хвост.
+        # Два простых запроса вместо OR, чтобы каждый шёл range-сканом по ix_anime_score_id.
+        score, last_id = position
+        items: list[dict[str, Any]] = []
+        if score is not None:
+            scored = stmt.where(tuple_(Anime.score, Anime.id) < (score, last_id))
+            items = await self._fetch_dicts(scored.order_by(*order).limit(query.limit))
+            last_id = None
+        # NULL-оценки под score >= min_score не попадают, хвост без оценки не нужен
+        if len(items) < query.limit and query.min_score is None:
+            unscored = stmt.where(Anime.score.is_(None))
+            if last_id is not None:
+                unscored = unscored.where(Anime.id < last_id)
+            # score здесь всегда NULL, но полный порядок индекса избавляет план от Sort:
+            # IS NULL планировщик за равенство не считает
+            unscored = unscored.order_by(*order).limit(query.limit - len(items))
+            items += await self._fetch_dicts(unscored)
+        return items
+
+    async def _fetch_dicts(self, stmt: Select[Any]) -> list[dict[str, Any]]:
+        return [row._asdict() for row in await self.session.execute(stmt)]
+
+    async def get_by_ids(self, anime_ids: list[int]) -> list[Anime]:
+        """Тайтлы в порядке anime_ids; отсутствующие пропускаются."""
+        if not anime_ids:
+            return []
+        result = await self.session.scalars(
+            select(Anime).options(*CATALOG_WITH_GENRES).where(Anime.id.in_(anime_ids))
+        )
+        by_id = {anime.id: anime for anime in result.all()}
+        return [by_id[anime_id] for anime_id in anime_ids if anime_id in by_id]
 
     async def get_recommendations(self, user_id: int, limit: int = 10) -> list[Anime]:
         from app.models.user_anime_list import UserAnimeList
+        from app.models.user_genre_affinity import UserGenreAffinity
 
-        top_genre_ids = (
-            select(anime_genres.c.genre_id)
-            .join(UserAnimeList, UserAnimeList.anime_id == anime_genres.c.anime_id)
-            .where(UserAnimeList.user_id == user_id)
-            .group_by(anime_genres.c.genre_id)
-            .order_by(func.count().desc())
+        # топ жанров берём из поддерживаемой affinity, а не агрегируем список каждый раз
+        top_genres = (
+            select(UserGenreAffinity.genre_id, UserGenreAffinity.weight)
+            .where(UserGenreAffinity.user_id == user_id, UserGenreAffinity.weight > 0)
+            .order_by(UserGenreAffinity.weight.desc())
             .limit(5)
+            .cte('top_genres')
         )
 
         in_list = (
@@ -88,21 +221,28 @@ class AnimeRepository:
             .where(UserAnimeList.user_id == user_id)
         )
 
+        candidates = (
+            select(anime_genres.c.anime_id, func.sum(top_genres.c.weight).label('affinity'))
+            .join(top_genres, top_genres.c.genre_id == anime_genres.c.genre_id)
+            .where(anime_genres.c.anime_id.notin_(in_list))
+            .group_by(anime_genres.c.anime_id)
+            .subquery()
+        )
+
         stmt = (
             select(Anime)
-            .join(anime_genres, anime_genres.c.anime_id == Anime.id)
-            .where(
-                anime_genres.c.genre_id.in_(top_genre_ids),
-                Anime.id.notin_(in_list),
+            .options(*CATALOG_WITH_GENRES)
+            .join(candidates, candidates.c.anime_id == Anime.id)
+            .order_by(
+                (candidates.c.affinity * func.coalesce(Anime.score, 0)).desc(),
+                Anime.id.desc(),
             )
-            .distinct()
-            .order_by(Anime.score.desc().nulls_last())
             .limit(limit)
         )
 
         result = await self.session.scalars(stmt)
         return list(result.all())
-    
+
     async def update(self, anime_id: int, update_data: AnimeUpdate) -> Optional[Anime]:
         values = update_data.model_dump(exclude_unset=True)
 
@@ -113,21 +253,29 @@ class AnimeRepository:
             update(Anime)
             .where(Anime.id == anime_id)
             .values(**values)
-            .returning(Anime)
+            .returning(Anime.id)
         )
 
-        result = await self.session.scalars(stmt)
+        updated_id = (await self.session.execute(stmt)).scalar_one_or_none()
         await self.session.commit()
-        return result.one_or_none()
+        if updated_id is None:
+            return None
+        await catalog_cache.invalidate()
+        return await self.get_by_id(updated_id)
     
     async def delete(self, anime_id: int) -> bool:
+        # каскад снесёт записи списков, а affinity по жанрам тайтла осталась бы — снимаем её до удаления
+        await self._replace_genre_links({anime_id: set()}, touch=False)
 
         stmt = delete(Anime).where(Anime.id == anime_id).execution_options(synchronize_session=False)
 
         result = await self.session.execute(stmt)
         await self.session.commit()
         cursor_result = cast(CursorResult[None], result)
-        return cursor_result.rowcount > 0
+        if cursor_result.rowcount == 0:
+            return False
+        await catalog_cache.invalidate()
+        return True
     
     async def exists_by_mal_id(self, mal_id: int) -> bool:
 
@@ -142,28 +290,192 @@ class AnimeRepository:
         return cast(bool, result.scalar())
     
     async def sync_genres(self, anime_id: int, genres_input: list[GenreInput]) -> Optional[Anime]:
-        anime = await self.get_by_id(anime_id)  
-        if not anime:
-            return None
-        
-        new_genre_ids = set()
-        for g in genres_input:
-            genre = await self.genre_repo.upsert(
-                name=g['name'],
-                mal_id=g.get('mal_id')
+        genre_ids = await self.genre_repo.bulk_upsert(genres_input)
+        await self._replace_genre_links({anime_id: set(genre_ids.values())})
+        await self.session.commit()
+        await self.genre_repo.publish_changes()
+        await catalog_cache.invalidate()
+        # после commit объект expired — select обновит и поля, и genres
+        return await self.get_by_id(anime_id)
+
+    async def _replace_genre_links(self, links: dict[int, set[int]], touch: bool = True) -> None:
+        """Приводит anime_genres к links (anime_id -> genre_ids) диффом, без delete-all/insert-all.
+
+        Один DELETE убирает исчезнувшие связи, один INSERT ... ON CONFLICT DO NOTHING
+        пишет только новые; неизменившиеся строки не трогаются. Affinity пользователей,
+        у которых тайтл в списке, сдвигается на реально изменившиеся связи. С touch
+        тайтлам с изменившимися жанрами сдвигается updated_at — от него считается ETag.
+        """
+        if not links:
+            return
+        pairs = [(anime_id, genre_id) for anime_id, genre_ids in links.items() for genre_id in genre_ids]
+
+        stmt = delete(anime_genres).where(anime_genres.c.anime_id.in_(list(links)))
+        if pairs:
+            stmt = stmt.where(tuple_(anime_genres.c.anime_id, anime_genres.c.genre_id).notin_(pairs))
+        removed = (await self.session.execute(
+            stmt.returning(anime_genres.c.anime_id, anime_genres.c.genre_id)
+        )).all()
+
+        added: list[Any] = []
+        if pairs:
+            added = (await self.session.execute(
+                pg_insert(anime_genres)
+                .values([{'anime_id': anime_id, 'genre_id': genre_id} for anime_id, genre_id in pairs])
+                .on_conflict_do_nothing()
+                .returning(anime_genres.c.anime_id, anime_genres.c.genre_id)
+            )).all()
+
+        await UserAnimeListRepository(self.session).shift_affinity_for_links(
+            [(anime_id, genre_id, -1) for anime_id, genre_id in removed]
+            + [(anime_id, genre_id, 1) for anime_id, genre_id in added]
+        )
+
+        changed = {anime_id for anime_id, _ in removed} | {anime_id for anime_id, _ in added}
+        if touch and changed:
+            await self.session.execute(
+                update(Anime)
+                .where(Anime.id.in_(changed))
+                .values(updated_at=func.now())
+                .execution_options(synchronize_session=False)
             )
-            new_genre_ids.add(genre.id)
-        
-        # Атомарный sync
+
+    async def bulk_upsert(
+        self,
+        animes: list[AnimeCreate],
+        genres: dict[int, list[GenreInput]],
+        content_hashes: dict[int, str],
+    ) -> dict[int, int]:
+        """Upsert пачки тайтлов с жанрами в одной транзакции, возвращает mal_id -> id записанных.
+
+        genres и content_hashes — по mal_id тайтла. Строки, чей хэш не изменился,
+        не перезаписываются и в результат не попадают.
+        """
+        now = datetime.now(timezone.utc)
+        rows = {
+            a.mal_id: {
+                **a.model_dump(),
+                'created_at': now,
+                'updated_at': now,
+                'last_synced_at': now,
+                'content_hash': content_hashes.get(a.mal_id),
+            }
+            for a in animes
+        }
+        if not rows:
+            return {}
+
+        genre_ids = await self.genre_repo.bulk_upsert(
+            [g for mal_id in rows for g in genres.get(mal_id, [])]
+        )
+
+        stmt = pg_insert(Anime).values(list(rows.values()))
+        updatable = [c for c in next(iter(rows.values())) if c not in ('mal_id', 'created_at')]
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Anime.mal_id],
+            set_={c: stmt.excluded[c] for c in updatable},
+            # страховка от гонки: без изменений — без новой версии строки
+            where=Anime.content_hash.is_distinct_from(stmt.excluded.content_hash),
+        ).returning(Anime.mal_id, Anime.id)
+        ids = {mal_id: anime_id for mal_id, anime_id in (await self.session.execute(stmt)).all()}
+
+        # updated_at записанных строк уже выставил сам upsert
+        await self._replace_genre_links({
+            ids[mal_id]: {genre_ids[g['name'].strip().title()] for g in genres.get(mal_id, [])}
+            for mal_id in ids
+        }, touch=False)
+
+        await self.session.commit()
+        await self.genre_repo.publish_changes()
+        await catalog_cache.invalidate()
+        return ids
+
+    async def mark_synced(self, anime_id: int, content_hash: str) -> None:
+        """last_synced_at и content_hash без commit — фиксируются вместе с остальной записью синка."""
         await self.session.execute(
-            delete(anime_genres).where(anime_genres.c.anime_id == anime_id)
+            update(Anime)
+            .where(Anime.id == anime_id)
+            # updated_at не трогаем: его уже выставила сама запись данных
+            .values(last_synced_at=func.now(), content_hash=content_hash, updated_at=Anime.updated_at)
         )
 
-        if new_genre_ids:
-            values = [{'anime_id': anime_id, 'genre_id': gid} for gid in new_genre_ids]
-            await self.session.execute(insert(anime_genres), values)
+    async def touch_synced(self, anime_ids: list[int]) -> None:
+        """Одним UPDATE отмечает синк тайтлов, которые Jikan вернул без изменений, и коммитит."""
+        if not anime_ids:
+            return
+        await self.session.execute(
+            update(Anime)
+            .where(Anime.id.in_(anime_ids))
+            # данные не менялись: updated_at (и ETag карточки) остаются прежними
+            .values(last_synced_at=func.now(), updated_at=Anime.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+        await self.session.commit()
+
+    async def claim_stale(self, limit: int) -> list[int]:
+        """Забирает до limit устаревших тайтлов на синхронизацию, возвращает их mal_id.
 
+        Устаревание зависит от статуса (airing — часы, finished — недели), среди
+        устаревших первыми идут те, что есть в списках у большего числа пользователей.
+        Взятые тайтлы арендуются на sync_claim_lease_minutes (sync_claimed_at), так что
+        параллельный прогон их не возьмёт; last_synced_at ставит только успешный синк.
+        """
+        finished = timedelta(hours=settings.sync_stale_finished_hours)
+        stale_after = {
+            AnimeStatus.AIRING: timedelta(hours=settings.sync_stale_airing_hours),
+            AnimeStatus.UPCOMING: timedelta(hours=settings.sync_stale_upcoming_hours),
+            AnimeStatus.FINISHED: finished,
+            None: finished,
+        }
+        last_synced = func.coalesce(Anime.last_synced_at, Anime.updated_at, Anime.created_at)
+        # по диапазону на статус, а не CASE в пороге: каждая ветка — range scan по ix_anime_status_last_synced
+        stale = or_(*(
+            and_(Anime.status == status, last_synced < func.now() - after)
+            for status, after in stale_after.items()
+        ))
+        lease = timedelta(minutes=settings.sync_claim_lease_minutes)
+        due = (
+            select(Anime.id)
+            .where(
+                Anime.mal_id.is_not(None),
+                stale,
+                or_(Anime.sync_claimed_at.is_(None), Anime.sync_claimed_at < func.now() - lease),
+            )
+            .order_by(Anime.sync_priority.desc(), last_synced.asc())
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        stmt = (
+            update(Anime)
+            .where(Anime.id.in_(due.scalar_subquery()))
+            .values(sync_claimed_at=func.now(), updated_at=Anime.updated_at)
+            .returning(Anime.mal_id)
+            .execution_options(synchronize_session=False)
+        )
+        mal_ids = list((await self.session.scalars(stmt)).all())
         await self.session.commit()
-        await self.session.refresh(anime, attribute_names=['genres']) 
+        return mal_ids
 
-        return anime
+    async def refresh_sync_priority(self) -> None:
+        """sync_priority = число пользователей, у которых тайтл в списке."""
+        from app.models.user_anime_list import UserAnimeList
+
+        counts = (
+            select(UserAnimeList.anime_id, func.count().label('users'))
+            .group_by(UserAnimeList.anime_id)
+            .subquery()
+        )
+        await self.session.execute(
+            update(Anime)
+            .where(Anime.id == counts.c.anime_id, Anime.sync_priority != counts.c.users)
+            .values(sync_priority=counts.c.users, updated_at=Anime.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+        # тайтлы, которые убрали из всех списков
+        await self.session.execute(
+            update(Anime)
+            .where(Anime.sync_priority != 0, ~exists().where(UserAnimeList.anime_id == Anime.id))
+            .values(sync_priority=0, updated_at=Anime.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+        await self.session.commit()
@@ -0,0 +1,84 @@
+from __future__ import annotations
+import asyncio
+from typing import TYPE_CHECKING
+
+from redis.asyncio import Redis
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.genre import Genre
+from app.utils.pubsub import start_listener
+
+if TYPE_CHECKING:
+    from app.repositories.genre_repo import GenreInput
+
+CHANNEL = 'genre:changed'
+
+
+class GenreCache:
+    """Словарь жанров в памяти процесса: name -> id и mal_id -> id.
+
+    Таблица крошечная и почти статичная, поэтому держим её целиком и
+    перечитываем по сигналу из Redis pub/sub, когда кто-то добавил жанр.
+    Пока кэш не загружен, все методы возвращают None и вызывающий идёт в БД.
+    """
+
+    def __init__(self):
+        self.by_name: dict[str, int] = {}
+        self.by_mal_id: dict[int, int] = {}
+        self.loaded = False
+        self._redis: Redis | None = None
+        self._session_factory: async_sessionmaker[AsyncSession] | None = None
+        self._listener: asyncio.Task | None = None
+
+    async def start(self, redis: Redis, session_factory: async_sessionmaker[AsyncSession]) -> None:
+        self._redis = redis
+        self._session_factory = session_factory
+        self._listener = start_listener(redis, CHANNEL, self._on_message, on_connect=self.load)
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+        self._redis = None
+        self.loaded = False
+
+    async def load(self) -> None:
+        if self._session_factory is None:
+            return
+        async with self._session_factory() as session:
+            rows = (await session.execute(select(Genre.id, Genre.name, Genre.mal_id))).all()
+        self.by_name = {name: genre_id for genre_id, name, _ in rows}
+        self.by_mal_id = {mal_id: genre_id for genre_id, _, mal_id in rows if mal_id is not None}
+        self.loaded = True
+
+    async def _on_message(self, data: bytes) -> None:
+        await self.load()
+
+    async def publish_changed(self) -> None:
+        if self._redis is not None:
+            await self._redis.publish(CHANNEL, '1')
+
+    def lookup(self, genres: list[GenreInput]) -> dict[str, int] | None:
+        """name -> id, если все жанры уже известны с теми же name и mal_id; иначе None."""
+        if not self.loaded:
+            return None
+        result: dict[str, int] = {}
+        for g in genres:
+            name = g['name'].strip().title()
+            genre_id = self.by_name.get(name)
+            mal_id = g.get('mal_id')
+            if genre_id is None or (mal_id is not None and self.by_mal_id.get(mal_id) != genre_id):
+                return None
+            result[name] = genre_id
+        return result
+
+    def match_name(self, pattern: str) -> list[int] | None:
+        """id жанров, в имени которых есть pattern (без учёта регистра), как ILIKE '%pattern%'."""
+        if not self.loaded:
+            return None
+        needle = pattern.strip().lower()
+        return [genre_id for name, genre_id in self.by_name.items() if needle in name.lower()]
+
+
+genre_cache = GenreCache()
@@ -1,12 +1,20 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from app.models.genre import Genre
-from typing import Optional
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app.models.anime import Anime
+from app.models.genre import Genre, anime_genres
+from app.repositories.genre_cache import genre_cache
+from typing import Optional, TypedDict
+
+class GenreInput(TypedDict):
+    name: str
+    mal_id: Optional[int]
 
 class GenreRepository:
 
     def __init__(self, session: AsyncSession):
         self.session = session
+        self._changed = False
 
     async def upsert(self, name: str, mal_id: Optional[int] = None) -> Genre:
         normalized_name = name.strip().title()
@@ -20,6 +28,7 @@ class GenreRepository:
                 if genre.name != normalized_name:
                     genre.name = normalized_name
                     await self.session.flush()
+                    await self._touch_anime([genre.id])
                 return genre
 
         stmt = select(Genre).where(Genre.name == normalized_name)
@@ -30,6 +39,7 @@ class GenreRepository:
             if mal_id is not None and genre.mal_id is None:
                 genre.mal_id = mal_id
                 await self.session.flush()
+                await self._touch_anime([genre.id])
             return genre
         
         genre = Genre(name=normalized_name, mal_id=mal_id)
@@ -37,6 +47,77 @@ class GenreRepository:
         await self.session.flush()
         return genre
     
+    async def bulk_upsert(self, genres: list[GenreInput]) -> dict[str, int]:
+        """Upsert пачки жанров одним INSERT ... ON CONFLICT, возвращает нормализованное имя -> id."""
+        cached = genre_cache.lookup(genres)
+        if cached is not None:
+            return cached
+
+        rows: dict[str, dict] = {}
+        result: dict[str, int] = {}
+        for g in genres:
+            normalized_name = g['name'].strip().title()
+            mal_id = g.get('mal_id')
+            if mal_id is None:
+                # жанры без mal_id из Jikan не приходят, но ручной ввод их допускает
+                if normalized_name not in result:
+                    genre = await self.upsert(name=normalized_name)
+                    result[normalized_name] = genre.id
+                continue
+            # одна строка на имя: дубли в одном INSERT ... ON CONFLICT недопустимы
+            rows.setdefault(normalized_name, {'mal_id': mal_id, 'name': normalized_name})
+
+        renamed: list[int] = []
+        if rows:
+            # ON CONFLICT ловит только mal_id: имя, занятое строкой с другим (или пустым)
+            # mal_id, разбираем старым upsert — он переиспользует строку по имени
+            names_by_mal_id = {row['mal_id']: name for name, row in rows.items()}
+            taken = await self.session.execute(
+                select(Genre.id, Genre.name, Genre.mal_id).where(
+                    or_(Genre.name.in_(list(rows)), Genre.mal_id.in_(list(names_by_mal_id)))
+                )
+            )
+            for genre_id, name, mal_id in taken.all():
+                new_name = names_by_mal_id.get(mal_id)
+                if name in rows and mal_id != rows[name]['mal_id']:
+                    genre = await self.upsert(name=name, mal_id=rows.pop(name)['mal_id'])
+                    result[name] = genre.id
+                elif new_name is not None and new_name != name and new_name in rows:
+                    # ON CONFLICT ниже переименует жанр
+                    renamed.append(genre_id)
+
+        if rows:
+            stmt = pg_insert(Genre).values(list(rows.values()))
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[Genre.mal_id],
+                set_={'name': stmt.excluded.name},
+            ).returning(Genre.id, Genre.name)
+            for genre_id, name in (await self.session.execute(stmt)).all():
+                result[name] = genre_id
+        await self._touch_anime(renamed)
+
+        # сюда попадаем только если в кэше чего-то не было — воркеры перечитают после commit
+        self._changed = True
+        return result
+
+    async def _touch_anime(self, genre_ids: list[int]) -> None:
+        """Жанр переименован или получил mal_id — ответ по его тайтлам изменился, ETag по updated_at тоже должен."""
+        if not genre_ids:
+            return
+        linked = select(anime_genres.c.anime_id).where(anime_genres.c.genre_id.in_(genre_ids))
+        await self.session.execute(
+            update(Anime)
+            .where(Anime.id.in_(linked))
+            .values(updated_at=func.now())
+            .execution_options(synchronize_session=False)
+        )
+
+    async def publish_changes(self) -> None:
+        """Зовётся после commit: до него другие сессии (и кэш этого процесса) новых жанров не видят."""
+        if self._changed:
+            self._changed = False
+            await genre_cache.publish_changed()
+
     async def get_by_name(self, name: str) -> Optional[Genre]:
         normalized_name = name.strip().title()
         stmt = select(Genre).where(Genre.name == normalized_name)
@@ -0,0 +1,29 @@
+from sqlalchemy.orm import joinedload, load_only, raiseload, selectinload
+
+from app.models.anime import Anime
+from app.models.user import User
+from app.models.user_anime_list import UserAnimeList
+
+# Связи моделей объявлены с lazy='raise': что грузить, решает запрос, а не модель.
+# Профили ниже — под конкретную форму ответа; всё, что в неё не входит, падает
+# на raiseload, а не уходит тихим запросом в БД.
+
+# get_current_user и /users/me: четыре колонки, без списка
+PRINCIPAL = (
+    load_only(User.id, User.email, User.is_active, User.created_at),
+    raiseload('*'),
+)
+
+# UserAnimeListResponse: запись + AnimeShort тем же запросом через JOIN
+LIST_WITH_ANIME_SHORT = (
+    joinedload(UserAnimeList.anime, innerjoin=True).load_only(
+        Anime.id, Anime.mal_id, Anime.title, Anime.image_url, Anime.score,
+    ),
+    raiseload('*'),
+)
+
+# AnimeResponse: тайтл + жанры одним дополнительным SELECT ... IN на страницу
+CATALOG_WITH_GENRES = (
+    selectinload(Anime.genres),
+    raiseload('*'),
+)
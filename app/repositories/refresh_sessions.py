@@ -0,0 +1,80 @@
+import enum
+
+from redis.asyncio import Redis
+
+# Сессии пользователя — хэш refresh_sessions:{user_id}: sid (устройство) -> "jti:expires_at".
+# Живой в семействе только последний выданный refresh-токен; время из Redis (TIME).
+
+# ARGV: sid, jti, ttl. Заодно чистит истёкшие сессии, чтобы хэш не рос с числом устройств.
+_CREATE_LUA = """
+local now = tonumber(redis.call('TIME')[1])
+local ttl = tonumber(ARGV[3])
+local entries = redis.call('HGETALL', KEYS[1])
+for i = 1, #entries, 2 do
+    local expires_at = tonumber(string.match(entries[i + 1], ':(%d+)$'))
+    if expires_at == nil or expires_at <= now then
+        redis.call('HDEL', KEYS[1], entries[i])
+    end
+end
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2] .. ':' .. (now + ttl))
+if redis.call('TTL', KEYS[1]) < ttl then
+    redis.call('EXPIRE', KEYS[1], ttl)
+end
+return 1
+"""
+
+# ARGV: sid, предъявленный jti, новый jti, ttl.
+# 1 — ротировано; 0 — сессии нет; -1 — предъявлен уже использованный токен, сессия отозвана.
+_ROTATE_LUA = """
+local now = tonumber(redis.call('TIME')[1])
+local ttl = tonumber(ARGV[4])
+local value = redis.call('HGET', KEYS[1], ARGV[1])
+if not value then
+    return 0
+end
+local jti, expires_at = string.match(value, '^(.*):(%d+)$')
+if tonumber(expires_at) <= now then
+    redis.call('HDEL', KEYS[1], ARGV[1])
+    return 0
+end
+if jti ~= ARGV[2] then
+    redis.call('HDEL', KEYS[1], ARGV[1])
+    return -1
+end
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[3] .. ':' .. (now + ttl))
+if redis.call('TTL', KEYS[1]) < ttl then
+    redis.call('EXPIRE', KEYS[1], ttl)
+end
+return 1
+"""
+
+
+class RotateResult(enum.IntEnum):
+    ROTATED = 1
+    NOT_FOUND = 0
+    REUSED = -1
+
+
+class RefreshSessionStore:
+    """Refresh-сессии по устройствам: ротация и детект повторного использования атомарны в Lua."""
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+        self._create = redis.register_script(_CREATE_LUA)
+        self._rotate = redis.register_script(_ROTATE_LUA)
+
+    @staticmethod
+    def _key(user_id: int) -> str:
+        return f"refresh_sessions:{user_id}"
+
+    async def create(self, user_id: int, sid: str, jti: str, ttl: int) -> None:
+        await self._create(keys=[self._key(user_id)], args=[sid, jti, ttl])
+
+    async def rotate(self, user_id: int, sid: str, jti: str, new_jti: str, ttl: int) -> RotateResult:
+        return RotateResult(int(await self._rotate(keys=[self._key(user_id)], args=[sid, jti, new_jti, ttl])))
+
+    async def revoke(self, user_id: int, sid: str) -> None:
+        await self.redis.hdel(self._key(user_id), sid)
+
+    async def revoke_all(self, user_id: int) -> None:
+        await self.redis.delete(self._key(user_id))
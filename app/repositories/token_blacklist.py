@@ -0,0 +1,121 @@
+import asyncio
+import time
+
+import structlog
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.config import settings
+from app.utils.pubsub import start_listener
+
+logger = structlog.get_logger(__name__)
+
+CHANNEL = 'token:revoked'
+KEY_PREFIX = 'blacklist:'
+
+
+class TokenBlacklist:
+    """Отозванные jti в памяти воркера, чтобы не ходить в Redis на каждый запрос.
+
+    Отзывов мало и живут они не дольше access-токена, поэтому держим их
+    целиком: jti -> unix-время истечения. Пополняется через pub/sub, при
+    (пере)подключении перечитывается из blacklist:* через SCAN. Пока
+    подписки нет, локальному набору не доверяем и спрашиваем Redis.
+    Кроме jti там же лежат отозванные сессии (sid) — все их access-токены разом.
+    """
+
+    _PRUNE_INTERVAL = 60.0
+
+    def __init__(self):
+        self._revoked: dict[str, float] = {}
+        self._synced = False
+        self._pruned_at = 0.0
+        self._redis: Redis | None = None
+        self._listener: asyncio.Task | None = None
+
+    async def start(self, redis: Redis) -> None:
+        self._redis = redis
+        try:
+            await self._load()
+        except RedisError as e:
+            logger.warning("token_blacklist_warmup_failed", error=str(e))
+        self._listener = start_listener(
+            redis, CHANNEL, self._on_message, on_connect=self._load, on_disconnect=self._on_disconnect
+        )
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+        self._redis = None
+        self._synced = False
+        self._revoked.clear()
+
+    async def _load(self) -> None:
+        if self._redis is None:
+            return
+        now = time.time()
+        revoked: dict[str, float] = {}
+        batch: list[bytes] = []
+
+        async def flush() -> None:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for key in batch:
+                    pipe.pttl(key)
+                ttls = await pipe.execute()
+            for key, ttl in zip(batch, ttls):
+                if ttl > 0:
+                    revoked[key.decode().removeprefix(KEY_PREFIX)] = now + ttl / 1000
+            batch.clear()
+
+        async for key in self._redis.scan_iter(match=f'{KEY_PREFIX}*', count=1000):
+            batch.append(key)
+            if len(batch) >= 1000:
+                await flush()
+        if batch:
+            await flush()
+        # то, что пришло по pub/sub во время SCAN, не теряем
+        self._revoked = {**revoked, **self._revoked}
+        self._synced = True
+
+    async def _on_disconnect(self) -> None:
+        self._synced = False
+
+    async def _on_message(self, data: bytes) -> None:
+        jti, _, expires_at = data.decode().partition(':')
+        self._revoked[jti] = float(expires_at)
+
+    async def revoke(self, jti: str, expires_at: int, redis: Redis) -> None:
+        """Кладёт jti в Redis до expires_at (unix) и рассылает остальным воркерам.
+
+        redis — как в is_revoked: отзыв не должен зависеть от того, запущен ли синглтон.
+        """
+        ttl = expires_at - int(time.time())
+        if ttl <= 0:
+            return
+        self._revoked[jti] = expires_at
+        await redis.set(f'{KEY_PREFIX}{jti}', '1', ex=ttl)
+        await redis.publish(CHANNEL, f'{jti}:{expires_at}')
+
+    async def revoke_session(self, session_id: str, redis: Redis) -> None:
+        """Отзывает все access-токены сессии (устройства): ни один не живёт дольше access TTL."""
+        expires_at = int(time.time()) + settings.access_token_expire_minutes * 60
+        await self.revoke(self._session_entry(session_id), expires_at, redis)
+
+    @staticmethod
+    def _session_entry(session_id: str) -> str:
+        # в том же наборе, что и jti; ':' не годится — это разделитель в сообщениях канала
+        return f'sid-{session_id}'
+
+    async def is_revoked(self, jti: str, redis: Redis, session_id: str | None = None) -> bool:
+        entries = [jti] if session_id is None else [jti, self._session_entry(session_id)]
+        if not self._synced:
+            return bool(await redis.exists(*(f'{KEY_PREFIX}{entry}' for entry in entries)))
+        now = time.time()
+        if now - self._pruned_at > self._PRUNE_INTERVAL:
+            self._revoked = {k: exp for k, exp in self._revoked.items() if exp > now}
+            self._pruned_at = now
+        return any(self._revoked.get(entry, 0) > now for entry in entries)
+
+
+token_blacklist = TokenBlacklist()
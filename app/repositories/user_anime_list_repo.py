@@ -1,12 +1,41 @@
-from typing import Optional
+from collections.abc import AsyncIterator
+from datetime import datetime, timezone
+from typing import Optional, cast
 
-from sqlalchemy import select, update, delete, exists
-from sqlalchemy.engine import CursorResult
+from sqlalchemy import Float, Integer, Select, case, column, func, select, update, delete, exists, literal, tuple_, values
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 
+from app.models.anime import Anime
+from app.models.genre import anime_genres
 from app.models.user_anime_list import UserAnimeList, WatchStatus
+from app.models.user_genre_affinity import UserGenreAffinity
+from app.repositories.loaders import LIST_WITH_ANIME_SHORT
 from app.schemas.user_anime_list import UserAnimeListCreate, UserAnimeListUpdate
 
+STATUS_WEIGHTS: dict[WatchStatus, float] = {
+    WatchStatus.COMPLETED: 1.0,
+    WatchStatus.WATCHING: 0.8,
+    WatchStatus.ON_HOLD: 0.4,
+    WatchStatus.PLAN_TO_WATCH: 0.3,
+    WatchStatus.DROPPED: -0.5,
+}
+
+
+def entry_weight(status: WatchStatus, score: Optional[float]) -> float:
+    """Вклад записи списка в affinity жанров: статус + сдвиг по оценке пользователя (5 — нейтрально)."""
+    weight = STATUS_WEIGHTS[status]
+    if score is not None:
+        weight += (score - 5) / 5
+    return weight
+
+
+# entry_weight на стороне БД — для пересчёта affinity по всем, у кого тайтл в списке
+_ENTRY_WEIGHT_SQL = case(
+    *((UserAnimeList.status == status, weight) for status, weight in STATUS_WEIGHTS.items())
+) + func.coalesce((UserAnimeList.score - 5) / 5, 0)
+
 
 class UserAnimeListRepository:
     def __init__(self, session: AsyncSession):
@@ -21,28 +50,66 @@ class UserAnimeListRepository:
             progress=data.progress,
         )
         self.session.add(entry)
+        await self._shift_affinity(user_id, {data.anime_id: entry_weight(data.status, data.score)})
         await self.session.commit()
-        await self.session.refresh(entry, attribute_names=["anime"])
-        return entry
+        return cast(UserAnimeList, await self.get_by_user_and_anime(user_id, data.anime_id))
+
+    @staticmethod
+    def _user_list_select(user_id: int, status: Optional[WatchStatus]) -> Select[tuple[UserAnimeList]]:
+        # порядок совпадает с ix_user_anime_list_user_created_id
+        stmt = (
+            select(UserAnimeList)
+            .options(*LIST_WITH_ANIME_SHORT)
+            .where(UserAnimeList.user_id == user_id)
+            .order_by(UserAnimeList.created_at.desc(), UserAnimeList.id.desc())
+        )
+        if status is not None:
+            stmt = stmt.where(UserAnimeList.status == status)
+        return stmt
 
     async def get_by_user(
         self,
         user_id: int,
         status: Optional[WatchStatus] = None,
+        limit: int = 100,
+        after: Optional[tuple[datetime, int]] = None,
     ) -> list[UserAnimeList]:
-        stmt = select(UserAnimeList).where(UserAnimeList.user_id == user_id)
-        if status is not None:
-            stmt = stmt.where(UserAnimeList.status == status)
-        stmt = stmt.order_by(UserAnimeList.created_at.desc())
+        """Страница списка; after — (created_at, id) последней записи предыдущей страницы."""
+        stmt = self._user_list_select(user_id, status).limit(limit)
+        if after is not None:
+            stmt = stmt.where(tuple_(UserAnimeList.created_at, UserAnimeList.id) < after)
         result = await self.session.scalars(stmt)
         return list(result.all())
 
+    async def stream_by_user(
+        self,
+        user_id: int,
+        status: Optional[WatchStatus] = None,
+    ) -> AsyncIterator[UserAnimeList]:
+        """Весь список серверным курсором, по 500 строк за раз, без материализации в памяти."""
+        stmt = self._user_list_select(user_id, status).execution_options(yield_per=500)
+        result = await self.session.stream_scalars(stmt)
+        async for entry in result:
+            yield entry
+
+    async def get_weights(self, user_id: int) -> dict[int, float]:
+        """anime_id -> entry_weight для всех записей пользователя (только нужные колонки)."""
+        stmt = select(UserAnimeList.anime_id, UserAnimeList.status, UserAnimeList.score).where(
+            UserAnimeList.user_id == user_id
+        )
+        rows = (await self.session.execute(stmt)).all()
+        return {anime_id: entry_weight(status, score) for anime_id, status, score in rows}
+
     async def get_by_user_and_anime(
         self, user_id: int, anime_id: int
     ) -> Optional[UserAnimeList]:
-        stmt = select(UserAnimeList).where(
-            UserAnimeList.user_id == user_id,
-            UserAnimeList.anime_id == anime_id,
+        stmt = (
+            select(UserAnimeList)
+            .options(*LIST_WITH_ANIME_SHORT)
+            .where(
+                UserAnimeList.user_id == user_id,
+                UserAnimeList.anime_id == anime_id,
+            )
         )
         result = await self.session.scalars(stmt)
         return result.one_or_none()
@@ -51,18 +118,28 @@ class UserAnimeListRepository:
         self, user_id: int, anime_id: int, data: UserAnimeListUpdate
     ) -> Optional[UserAnimeList]:
         values = data.model_dump(exclude_unset=True)
+        # старые status/score нужны для дельты affinity — берём их тем же UPDATE через FROM
+        old = aliased(UserAnimeList)
+        old_entry = (
+            select(old.id, old.status, old.score)
+            .where(old.user_id == user_id, old.anime_id == anime_id)
+            .with_for_update()
+            .subquery()
+        )
         stmt = (
             update(UserAnimeList)
-            .where(
-                UserAnimeList.user_id == user_id,
-                UserAnimeList.anime_id == anime_id,
-            )
+            .where(UserAnimeList.id == old_entry.c.id)
             .values(**values)
+            .returning(old_entry.c.status, old_entry.c.score, UserAnimeList.status, UserAnimeList.score)
             .execution_options(synchronize_session=False)
         )
-        result = await self.session.execute(stmt)
-        if result.rowcount == 0:
+        row = (await self.session.execute(stmt)).one_or_none()
+        if row is None:
             return None
+        old_status, old_score, new_status, new_score = row
+        delta = entry_weight(new_status, new_score) - entry_weight(old_status, old_score)
+        if delta:
+            await self._shift_affinity(user_id, {anime_id: delta})
         await self.session.commit()
         return await self.get_by_user_and_anime(user_id, anime_id)
 
@@ -73,11 +150,116 @@ class UserAnimeListRepository:
                 UserAnimeList.user_id == user_id,
                 UserAnimeList.anime_id == anime_id,
             )
+            .returning(UserAnimeList.status, UserAnimeList.score)
             .execution_options(synchronize_session=False)
         )
-        result = await self.session.execute(stmt)
+        row = (await self.session.execute(stmt)).one_or_none()
+        if row is None:
+            return False
+        await self._shift_affinity(user_id, {anime_id: -entry_weight(row.status, row.score)})
+        await self.session.commit()
+        return True
+
+    async def bulk_upsert(self, user_id: int, entries: list[UserAnimeListCreate]) -> int:
+        """Upsert пачки записей пользователя одним INSERT ... ON CONFLICT, affinity — одной суммарной дельтой."""
+        by_anime = {entry.anime_id: entry for entry in entries}
+        if not by_anime:
+            return 0
+
+        previous_stmt = (
+            select(UserAnimeList.anime_id, UserAnimeList.status, UserAnimeList.score)
+            .where(UserAnimeList.user_id == user_id, UserAnimeList.anime_id.in_(list(by_anime)))
+            .with_for_update()
+        )
+        previous = {
+            anime_id: entry_weight(status, score)
+            for anime_id, status, score in (await self.session.execute(previous_stmt)).all()
+        }
+
+        now = datetime.now(timezone.utc)
+        stmt = pg_insert(UserAnimeList).values([
+            {
+                'user_id': user_id,
+                'anime_id': anime_id,
+                'status': entry.status,
+                'score': entry.score,
+                'progress': entry.progress,
+                'created_at': now,
+                'updated_at': now,
+            }
+            for anime_id, entry in by_anime.items()
+        ])
+        stmt = stmt.on_conflict_do_update(
+            constraint='uq_user_anime',
+            set_={c: stmt.excluded[c] for c in ('status', 'score', 'progress', 'updated_at')},
+        )
+        await self.session.execute(stmt)
+
+        deltas = {
+            anime_id: entry_weight(entry.status, entry.score) - previous.get(anime_id, 0.0)
+            for anime_id, entry in by_anime.items()
+        }
+        await self._shift_affinity(user_id, {anime_id: d for anime_id, d in deltas.items() if d})
         await self.session.commit()
-        return result.rowcount > 0
+        return len(by_anime)
+
+    async def stream_export(
+        self, user_id: int
+    ) -> AsyncIterator[tuple[int, str, WatchStatus, Optional[float], Optional[int]]]:
+        """(mal_id, title, status, score, progress) всего списка серверным курсором; тайтлы без mal_id пропускаются."""
+        stmt = (
+            select(Anime.mal_id, Anime.title, UserAnimeList.status, UserAnimeList.score, UserAnimeList.progress)
+            .join(Anime, Anime.id == UserAnimeList.anime_id)
+            .where(UserAnimeList.user_id == user_id, Anime.mal_id.is_not(None))
+            .order_by(UserAnimeList.created_at.desc(), UserAnimeList.id.desc())
+            .execution_options(yield_per=500)
+        )
+        result = await self.session.stream(stmt)
+        async for row in result:
+            yield row.tuple()
+
+    async def _shift_affinity(self, user_id: int, deltas: dict[int, float]) -> None:
+        """Прибавляет дельты (anime_id -> delta) к affinity по жанрам тайтлов одним INSERT ... SELECT."""
+        if not deltas:
+            return
+        shifts = values(
+            column('anime_id', Integer), column('delta', Float), name='shifts'
+        ).data(list(deltas.items()))
+        genres = (
+            select(literal(user_id), anime_genres.c.genre_id, func.sum(shifts.c.delta))
+            .join(shifts, shifts.c.anime_id == anime_genres.c.anime_id)
+            .group_by(anime_genres.c.genre_id)
+        )
+        stmt = pg_insert(UserGenreAffinity).from_select(
+            ['user_id', 'genre_id', 'weight'], genres
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[UserGenreAffinity.user_id, UserGenreAffinity.genre_id],
+            set_={'weight': UserGenreAffinity.weight + stmt.excluded.weight},
+        )
+        await self.session.execute(stmt)
+
+    async def shift_affinity_for_links(self, changes: list[tuple[int, int, int]]) -> None:
+        """У тайтлов поменялись жанры: (anime_id, genre_id, +1/-1) — сдвигает affinity всех владельцев списков.
+
+        Без commit — вызывается внутри транзакции, которая меняет anime_genres.
+        """
+        if not changes:
+            return
+        links = values(
+            column('anime_id', Integer), column('genre_id', Integer), column('sign', Integer), name='links'
+        ).data(changes)
+        shifts = (
+            select(UserAnimeList.user_id, links.c.genre_id, func.sum(links.c.sign * _ENTRY_WEIGHT_SQL))
+            .join(links, links.c.anime_id == UserAnimeList.anime_id)
+            .group_by(UserAnimeList.user_id, links.c.genre_id)
+        )
+        stmt = pg_insert(UserGenreAffinity).from_select(['user_id', 'genre_id', 'weight'], shifts)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[UserGenreAffinity.user_id, UserGenreAffinity.genre_id],
+            set_={'weight': UserGenreAffinity.weight + stmt.excluded.weight},
+        )
+        await self.session.execute(stmt)
 
     async def exists(self, user_id: int, anime_id: int) -> bool:
         stmt = select(
@@ -0,0 +1,100 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from datetime import datetime
+
+from redis.asyncio import Redis
+
+from app.config import settings
+from app.utils.pubsub import start_listener
+
+CHANNEL = 'user:changed'
+
+
+@dataclass(frozen=True)
+class UserPrincipal:
+    """То, что нужно auth-зависимости и /users/me, без ORM-объекта и его связей."""
+
+    id: int
+    email: str
+    is_active: bool
+    created_at: datetime
+
+
+class UserPrincipalCache:
+    """Двухуровневый кэш принципалов: LRU в памяти воркера (секунды) и Redis (минуты).
+
+    Локальные копии на других воркерах сбрасываются через pub/sub, когда
+    пользователя деактивировали или он вышел. Пока кэш не запущен, get
+    возвращает None и вызывающий идёт в БД.
+    """
+
+    def __init__(self, max_size: int = 10_000):
+        self.max_size = max_size
+        self._local: OrderedDict[int, tuple[float, UserPrincipal]] = OrderedDict()
+        self._redis: Redis | None = None
+        self._listener: asyncio.Task | None = None
+
+    @staticmethod
+    def _key(user_id: int) -> str:
+        return f'user:principal:{user_id}'
+
+    async def start(self, redis: Redis) -> None:
+        self._redis = redis
+        self._listener = start_listener(redis, CHANNEL, self._on_message, on_connect=self._clear_local)
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+        self._redis = None
+        self._local.clear()
+
+    async def _clear_local(self) -> None:
+        # пока не были подписаны, могли пропустить инвалидацию
+        self._local.clear()
+
+    async def _on_message(self, data: bytes) -> None:
+        self._local.pop(int(data), None)
+
+    async def get(self, user_id: int) -> UserPrincipal | None:
+        cached = self._local.get(user_id)
+        if cached is not None:
+            expires_at, principal = cached
+            if expires_at > time.monotonic():
+                self._local.move_to_end(user_id)
+                return principal
+            del self._local[user_id]
+
+        if self._redis is None:
+            return None
+        raw = await self._redis.get(self._key(user_id))
+        if raw is None:
+            return None
+        data = json.loads(raw)
+        principal = UserPrincipal(**{**data, 'created_at': datetime.fromisoformat(data['created_at'])})
+        self._remember(principal)
+        return principal
+
+    async def set(self, principal: UserPrincipal) -> None:
+        self._remember(principal)
+        if self._redis is not None:
+            data = {**asdict(principal), 'created_at': principal.created_at.isoformat()}
+            await self._redis.set(self._key(principal.id), json.dumps(data), ex=settings.user_cache_ttl)
+
+    async def invalidate(self, user_id: int) -> None:
+        self._local.pop(user_id, None)
+        if self._redis is not None:
+            await self._redis.delete(self._key(user_id))
+            await self._redis.publish(CHANNEL, str(user_id))
+
+    def _remember(self, principal: UserPrincipal) -> None:
+        self._local[principal.id] = (time.monotonic() + settings.user_cache_local_ttl, principal)
+        self._local.move_to_end(principal.id)
+        while len(self._local) > self.max_size:
+            self._local.popitem(last=False)
+
+
+user_cache = UserPrincipalCache()
@@ -1,21 +1,22 @@
 from typing import Optional
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, exists
+from sqlalchemy import select, exists, update
 
 from app.models.user import User
+from app.repositories.loaders import PRINCIPAL
+from app.repositories.user_cache import UserPrincipal, user_cache
 from app.schemas.auth import RegisterRequest
-from app.utils.security import hash_password
 
 
 class UserRepository:
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def create(self, data: RegisterRequest) -> User:
+    async def create(self, data: RegisterRequest, hashed_password: str) -> User:
         user = User(
             email=data.email,
-            hashed_password=hash_password(data.password),
+            hashed_password=hashed_password,
         )
         self.session.add(user)
         await self.session.commit()
@@ -26,6 +27,26 @@ class UserRepository:
         result = await self.session.scalars(select(User).where(User.id == user_id))
         return result.one_or_none()
 
+    async def get_principal(self, user_id: int) -> Optional[UserPrincipal]:
+        user = await self.session.scalar(select(User).options(*PRINCIPAL).where(User.id == user_id))
+        if user is None:
+            return None
+        return UserPrincipal(user.id, user.email, user.is_active, user.created_at)
+
+    async def update_password_hash(self, user_id: int, hashed_password: str) -> None:
+        await self.session.execute(
+            update(User).where(User.id == user_id).values(hashed_password=hashed_password)
+        )
+        await self.session.commit()
+
+    async def set_active(self, user_id: int, is_active: bool) -> bool:
+        result = await self.session.execute(
+            update(User).where(User.id == user_id).values(is_active=is_active).returning(User.id)
+        )
+        await self.session.commit()
+        await user_cache.invalidate(user_id)
+        return result.scalar_one_or_none() is not None
+
     async def get_by_email(self, email: str) -> Optional[User]:
         result = await self.session.scalars(select(User).where(User.email == email))
         return result.one_or_none()
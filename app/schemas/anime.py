@@ -1,8 +1,9 @@
-from pydantic import BaseModel, ConfigDict, Field
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
+from typing import Optional, TypedDict
 from datetime import datetime
 
 from app.models.anime import AnimeStatus, AnimeSeason
+from app.utils.cursor import decode_cursor
 
 class AnimeBase(BaseModel):
     title: str = Field(..., min_length=1, max_length=255, description='название аниме')
@@ -57,6 +58,35 @@ class AnimeResponse(AnimeBase):
     genres: list[GenreResponse] = []
 
 
+class GenreRow(TypedDict):
+    id: int
+    name: str
+    mal_id: Optional[int]
+
+
+class AnimeRow(TypedDict):
+    """Строка быстрого пути каталога — те же поля, что у AnimeResponse."""
+    id: int
+    mal_id: int
+    title: str
+    title_english: Optional[str]
+    title_japanese: Optional[str]
+    synopsis: Optional[str]
+    score: Optional[float]
+    episodes: Optional[int]
+    status: Optional[AnimeStatus]
+    season: Optional[AnimeSeason]
+    year: Optional[int]
+    image_url: Optional[str]
+    created_at: datetime
+    updated_at: Optional[datetime]
+    genres: list[GenreRow]
+
+
+# Строки из БД уже валидны: сериализуем их в JSON без валидации и без ORM
+anime_rows_json = TypeAdapter(list[AnimeRow])
+
+
 class CatalogQuery(BaseModel):
     genre: Optional[str] = Field(None, description='Фильтр по жанру (частичное совпадение)')
     status: Optional[AnimeStatus] = Field(None, description='Статус аниме')
@@ -66,5 +96,19 @@ class CatalogQuery(BaseModel):
     search: Optional[str] = Field(None, max_length=100, description='Поиск по названию')
     limit: int = Field(25, ge=1, le=100)
     offset: int = Field(0, ge=0)
+    cursor: Optional[str] = Field(None, description='Курсор следующей страницы из X-Next-Cursor, offset при нём игнорируется')
+
+    model_config = ConfigDict(populate_by_name=True)
 
-    model_config = ConfigDict(populate_by_name=True)
\ No newline at end of file
+    def cursor_position(self) -> Optional[tuple[Optional[float], int]]:
+        """(score, id) последней строки предыдущей страницы; ValueError для битого курсора."""
+        if self.cursor is None:
+            return None
+        values = decode_cursor(self.cursor)
+        if (
+            len(values) != 2
+            or not isinstance(values[1], int)
+            or not (values[0] is None or isinstance(values[0], (int, float)))
+        ):
+            raise ValueError('invalid cursor')
+        return values[0], values[1]
\ No newline at end of file
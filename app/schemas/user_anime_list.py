@@ -3,6 +3,7 @@ from typing import Optional
 from datetime import datetime
 
 from app.models.user_anime_list import WatchStatus
+from app.utils.cursor import decode_cursor
 
 
 class AnimeShort(BaseModel):
@@ -28,6 +29,20 @@ class UserAnimeListUpdate(BaseModel):
     progress: Optional[int] = Field(None, ge=0)
 
 
+class UserAnimeListImport(BaseModel):
+    """Запись импорта/экспорта: тайтл по mal_id, как в выгрузке MyAnimeList."""
+    mal_id: int = Field(..., ge=1)
+    status: WatchStatus
+    score: Optional[float] = Field(None, ge=0.0, le=10.0)
+    progress: Optional[int] = Field(None, ge=0)
+
+
+class ListImportResponse(BaseModel):
+    imported: int = Field(..., description='записано сразу')
+    queued: int = Field(..., description='тайтлов ещё нет в базе — допишутся после синхронизации с Jikan')
+    skipped: int = Field(..., description='нераспознанные записи')
+
+
 class UserAnimeListResponse(BaseModel):
     id: int
     anime_id: int
@@ -39,3 +54,11 @@ class UserAnimeListResponse(BaseModel):
     anime: AnimeShort
 
     model_config = ConfigDict(from_attributes=True)
+
+
+def list_cursor_position(cursor: str) -> tuple[datetime, int]:
+    """(created_at, id) из X-Next-Cursor списка; ValueError для битого курсора."""
+    values = decode_cursor(cursor)
+    if len(values) != 2 or not isinstance(values[0], str) or not isinstance(values[1], int):
+        raise ValueError('invalid cursor')
+    return datetime.fromisoformat(values[0]), values[1]
@@ -1,10 +1,20 @@
+import asyncio
+import hashlib
+import json
+from typing import cast
+
 import httpx
+import structlog
 from fastapi import HTTPException, status as http_status
+from redis.asyncio import Redis
+from redis.exceptions import LockError
+from sqlalchemy.exc import IntegrityError
 
-from app.external.jikan_client import JikanClient
+from app.external.jikan_client import JIKAN_PAGE_SIZE, JikanClient
 from app.models.anime import Anime, AnimeStatus, AnimeSeason
 from app.repositories.anime_repo import AnimeRepository, GenreInput
 from app.schemas.anime import AnimeCreate, AnimeUpdate
+from app.utils.singleflight import SingleFlight
 
 _STATUS_MAP = {
     "Finished Airing": AnimeStatus.FINISHED,
@@ -12,23 +22,105 @@ _STATUS_MAP = {
     "Not yet aired": AnimeStatus.UPCOMING,
 }
 
+logger = structlog.get_logger(__name__)
+
+# Конкурентные промахи по одному mal_id внутри воркера ждут один fetch
+_inflight_fetches = SingleFlight()
+
 
 class AnimeService:
-    def __init__(self, repo: AnimeRepository, jikan: JikanClient):
+    def __init__(self, repo: AnimeRepository, jikan: JikanClient, redis: Redis | None = None):
         self.repo = repo
         self.jikan = jikan
+        self.redis = redis
 
     async def get_or_fetch_by_mal_id(self, mal_id: int) -> Anime:
         anime = await self.repo.get_by_mal_id(mal_id)
         if anime:
             return anime
-        data = await self._fetch_from_jikan(mal_id)
-        return await self._save_from_jikan(data)
+        anime, shared = await _inflight_fetches.do(mal_id, lambda: self._fetch_and_save_locked(mal_id))
+        if shared:
+            # объект лидера привязан к его сессии — перечитываем в своей
+            anime = await self.repo.get_by_mal_id(mal_id)
+        return anime
+
+    async def _fetch_and_save_locked(self, mal_id: int) -> Anime:
+        """Fetch + save под Redis-локом, чтобы между воркерами тайтл тянулся один раз."""
+        if self.redis is None:
+            return await self.sync_from_jikan(mal_id)
+
+        lock = self.redis.lock(f"lock:anime:mal:{mal_id}", timeout=30, blocking_timeout=30)
+        acquired = await lock.acquire()
+        try:
+            # пока ждали лок, другой воркер мог уже сохранить тайтл
+            anime = await self.repo.get_by_mal_id(mal_id)
+            if anime:
+                return anime
+            return await self.sync_from_jikan(mal_id)
+        finally:
+            if acquired:
+                try:
+                    await lock.release()
+                except LockError:
+                    pass  # лок истёк по timeout, его уже мог взять другой воркер
 
     async def sync_from_jikan(self, mal_id: int) -> Anime:
         data = await self._fetch_from_jikan(mal_id)
         return await self._save_from_jikan(data)
 
+    async def sync_batch_from_jikan(self, mal_ids: list[int]) -> dict[int, int]:
+        """Тянет /anime/{id}/full для пачки через один клиент и пишет её одной транзакцией."""
+        results = await asyncio.gather(
+            *(self.jikan.get_anime_by_id(mal_id) for mal_id in mal_ids),
+            return_exceptions=True,
+        )
+
+        animes: list[AnimeCreate] = []
+        genres: dict[int, list[GenreInput]] = {}
+        hashes: dict[int, str] = {}
+        for mal_id, data in zip(mal_ids, results):
+            if isinstance(data, BaseException):
+                logger.warning("jikan_fetch_failed", mal_id=mal_id, error=repr(data))
+                continue
+            try:
+                animes.append(self._parse(data))
+            except ValueError as e:
+                logger.warning("jikan_payload_invalid", mal_id=mal_id, error=str(e))
+                continue
+            genres[mal_id] = self._extract_genres(data)
+            hashes[mal_id] = self._content_hash(animes[-1], genres[mal_id])
+
+        # одним запросом отсекаем тайтлы, которые Jikan вернул без изменений
+        known = await self.repo.get_content_hashes(list(hashes))
+        unchanged = {
+            mal_id: known[mal_id][0]
+            for mal_id, content_hash in hashes.items()
+            if mal_id in known and known[mal_id][1] == content_hash
+        }
+        await self.repo.touch_synced(list(unchanged.values()))
+        changed = [anime for anime in animes if anime.mal_id not in unchanged]
+        return {**unchanged, **await self.repo.bulk_upsert(changed, genres, hashes)}
+
+    async def sync_stale_from_jikan(self, budget: int) -> int:
+        """Обновляет до budget устаревших тайтлов пачками; темп задаёт общий rate limiter Jikan."""
+        mal_ids = await self.repo.claim_stale(budget)
+        synced = 0
+        for start in range(0, len(mal_ids), JIKAN_PAGE_SIZE):
+            synced += len(await self.sync_batch_from_jikan(mal_ids[start:start + JIKAN_PAGE_SIZE]))
+        logger.info("stale_anime_synced", claimed=len(mal_ids), synced=synced)
+        return synced
+
+    async def sync_top_from_jikan(self, limit: int) -> int:
+        synced = 0
+        pages = -(-limit // JIKAN_PAGE_SIZE)
+        for page in range(1, pages + 1):
+            top = await self.jikan.get_top_anime(limit=JIKAN_PAGE_SIZE, page=page)
+            mal_ids = [item["mal_id"] for item in top][: limit - (page - 1) * JIKAN_PAGE_SIZE]
+            if not mal_ids:
+                break
+            synced += len(await self.sync_batch_from_jikan(mal_ids))
+        return synced
+
     async def _fetch_from_jikan(self, mal_id: int) -> dict:
         try:
             return await self.jikan.get_anime_by_id(mal_id)
@@ -52,14 +144,28 @@ class AnimeService:
         mal_id = data["mal_id"]
         anime_data = self._parse(data)
         genres = self._extract_genres(data)
+        content_hash = self._content_hash(anime_data, genres)
 
         existing = await self.repo.get_by_mal_id(mal_id)  # 1 query instead of exists+get
+        if existing and existing.content_hash == content_hash:
+            # Jikan вернул то же самое — ни записи данных, ни жанров, ни инвалидации кэшей
+            anime_id = existing.id
+            await self.repo.touch_synced([anime_id])
+            return cast(Anime, await self.repo.get_by_id(anime_id))
         if existing:
             update_data = AnimeUpdate(**anime_data.model_dump(exclude={"mal_id"}))
-            anime = await self.repo.update(existing.id, update_data)  # use RETURNING result
+            anime = await self.repo.update(existing.id, update_data)
         else:
-            anime = await self.repo.create(anime_data)
+            try:
+                anime = await self.repo.create(anime_data)
+            except IntegrityError:
+                # тайтл параллельно вставила sync-задача — обновляем его запись
+                await self.repo.session.rollback()
+                existing = await self.repo.get_by_mal_id(mal_id)
+                update_data = AnimeUpdate(**anime_data.model_dump(exclude={"mal_id"}))
+                anime = await self.repo.update(existing.id, update_data)
 
+        await self.repo.mark_synced(anime.id, content_hash)
         anime = await self.repo.sync_genres(anime.id, genres)  # always sync, even if empty
         return anime
 
@@ -80,6 +186,16 @@ class AnimeService:
             image_url=data.get("images", {}).get("jpg", {}).get("image_url"),
         )
 
+    @staticmethod
+    def _content_hash(anime_data: AnimeCreate, genres: list[GenreInput]) -> str:
+        """Хэш того, что мы пишем в БД из ответа Jikan, а не всего ответа (там есть шумные поля)."""
+        payload = {
+            'anime': anime_data.model_dump(mode='json'),
+            'genres': sorted((g.get('mal_id') or 0, g['name']) for g in genres),
+        }
+        raw = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+        return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
     def _extract_genres(self, data: dict) -> list[GenreInput]:
         genres: list[GenreInput] = []
         for g in data.get("genres", []) + data.get("themes", []):
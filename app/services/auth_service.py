@@ -1,19 +1,31 @@
-from datetime import datetime, timezone, timedelta
+import uuid
+from datetime import timedelta
+
+import structlog
 
 from fastapi import HTTPException, status
 from redis.asyncio import Redis
 
 from app.config import settings
+from app.repositories.refresh_sessions import RefreshSessionStore, RotateResult
+from app.repositories.token_blacklist import token_blacklist
+from app.repositories.user_cache import user_cache
 from app.repositories.user_repo import UserRepository
 from app.schemas.auth import RegisterRequest, LoginRequest, TokenResponse
-from app.utils.jwt import create_access_token, create_refresh_token, decode_token
-from app.utils.security import verify_password
+from app.utils.jwt import create_access_token, create_refresh_token, decode_token, forget_token
+from app.services.login_throttle import LoginThrottle
+from app.services.password_hasher import password_hasher
+from app.utils.security import needs_rehash
+
+logger = structlog.get_logger(__name__)
 
 
 class AuthService:
     def __init__(self, user_repo: UserRepository, redis: Redis):
         self.user_repo = user_repo
         self.redis = redis
+        self.throttle = LoginThrottle(redis)
+        self.sessions = RefreshSessionStore(redis)
 
     async def register(self, data: RegisterRequest) -> TokenResponse:
         if await self.user_repo.exists_by_email(data.email):
@@ -21,12 +33,22 @@ class AuthService:
                 status_code=status.HTTP_409_CONFLICT,
                 detail="Email already registered",
             )
-        user = await self.user_repo.create(data)
+        hashed_password = await password_hasher.hash(data.password)
+        user = await self.user_repo.create(data, hashed_password)
         return await self._issue_tokens(user.id)
 
-    async def login(self, data: LoginRequest) -> TokenResponse:
+    async def login(self, data: LoginRequest, client_ip: str | None = None) -> TokenResponse:
+        # до БД и bcrypt: перебор упирается в Redis, а не в CPU
+        await self.throttle.check(data.email, client_ip)
+
         user = await self.user_repo.get_by_email(data.email)
-        if not user or not verify_password(data.password, user.hashed_password):
+        if user is None:
+            await password_hasher.verify_dummy(data.password)
+            verified = False
+        else:
+            verified = await password_hasher.verify(data.password, user.hashed_password)
+        if not user or not verified:
+            await self.throttle.record_failure(data.email)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid email or password",
@@ -37,19 +59,34 @@ class AuthService:
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Account is inactive",
             )
-        return await self._issue_tokens(user.id)
+        await self.throttle.reset(data.email)
+        # id до commit'а перехэширования: после него user истёк и ленивая загрузка в async недоступна
+        user_id = user.id
+        if needs_rehash(user.hashed_password):
+            # cost поменялся — пароль в открытом виде есть только сейчас
+            await self.user_repo.update_password_hash(user_id, await password_hasher.hash(data.password))
+        return await self._issue_tokens(user_id)
 
     async def logout(self, access_token: str, user_id: int) -> None:
         payload = decode_token(access_token)
-        jti: str = payload["jti"]
-        exp: int = payload["exp"]
-
-        now_ts = int(datetime.now(timezone.utc).timestamp())
-        ttl = exp - now_ts
-        if ttl > 0:
-            await self.redis.setex(f"blacklist:{jti}", ttl, "1")
-
-        await self.redis.delete(f"refresh_token:{user_id}")
+        await token_blacklist.revoke(payload["jti"], payload["exp"], self.redis)
+        forget_token(access_token)
+
+        # выходим только на этом устройстве; у токенов без sid сессию не определить
+        session_id = payload.get("sid")
+        if session_id is not None:
+            await self.sessions.revoke(user_id, session_id)
+            # и access-токены, выданные этому устройству прошлыми ротациями
+            await token_blacklist.revoke_session(session_id, self.redis)
+        else:
+            await self.sessions.revoke_all(user_id)
+        await user_cache.invalidate(user_id)
+
+    async def deactivate(self, user_id: int) -> None:
+        """Отключение аккаунта: все устройства выходят, логин отвечает 403 до повторной активации."""
+        # set_active сбрасывает кэш принципала — живые access-токены других устройств сразу получают 403
+        await self.user_repo.set_active(user_id, False)
+        await self.sessions.revoke_all(user_id)
 
     async def refresh(self, refresh_token: str) -> TokenResponse:
         payload = decode_token(refresh_token)
@@ -62,32 +99,46 @@ class AuthService:
             )
 
         user_id = int(payload["sub"])
-        stored = await self.redis.get(f"refresh_token:{user_id}")
-
-        if stored is None:
+        session_id = payload.get("sid")
+        new_jti = str(uuid.uuid4())
+        result = RotateResult.NOT_FOUND
+        if session_id is not None:
+            result = await self.sessions.rotate(user_id, session_id, payload["jti"], new_jti, self._refresh_ttl())
+
+        if result is RotateResult.REUSED:
+            # старый токен предъявлен второй раз — его мог увести кто-то ещё, гасим всю сессию:
+            # refresh-семейство уже удалено скриптом, access-токены сессии — в blacklist
+            logger.warning("refresh_token_reused", user_id=user_id, session_id=session_id)
+            await token_blacklist.revoke_session(session_id, self.redis)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Refresh token not found, please login again",
+                detail="Refresh token reuse detected, please login again",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-
-        stored_str = stored.decode() if isinstance(stored, bytes) else stored
-        if stored_str != refresh_token:
+        if result is RotateResult.NOT_FOUND:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Refresh token mismatch, please login again",
+                detail="Refresh token not found, please login again",
                 headers={"WWW-Authenticate": "Bearer"},
             )
 
-        return await self._issue_tokens(user_id)
+        return self._tokens(user_id, session_id, new_jti)
 
     async def _issue_tokens(self, user_id: int) -> TokenResponse:
-        access_token = create_access_token(user_id)
-        refresh_token = create_refresh_token(user_id)
-
-        refresh_ttl = int(timedelta(days=settings.refresh_token_expire_days).total_seconds())
-        await self.redis.setex(f"refresh_token:{user_id}", refresh_ttl, refresh_token)
-
+        """Новая сессия (устройство) — на логине и регистрации."""
+        session_id = uuid.uuid4().hex
+        jti = str(uuid.uuid4())
+        await self.sessions.create(user_id, session_id, jti, self._refresh_ttl())
+        return self._tokens(user_id, session_id, jti)
+
+    @staticmethod
+    def _refresh_ttl() -> int:
+        return int(timedelta(days=settings.refresh_token_expire_days).total_seconds())
+
+    @staticmethod
+    def _tokens(user_id: int, session_id: str, refresh_jti: str) -> TokenResponse:
+        access_token = create_access_token(user_id, session_id)
+        refresh_token = create_refresh_token(user_id, session_id, refresh_jti)
         return TokenResponse(
             access_token=access_token,
             refresh_token=refresh_token,
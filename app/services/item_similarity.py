@@ -0,0 +1,120 @@
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import scipy.sparse as sp
+
+
+# Одна строка на тайтл (по возрастанию anime_id): top-K соседей как индексы строк + их веса.
+# Один структурированный .npy — его можно атомарно подменить через os.replace
+# и открыть в API-воркерах через mmap без копирования в память процесса.
+def index_dtype(top_k: int) -> np.dtype:
+    return np.dtype([
+        ('item', np.int32),
+        ('neighbors', np.int32, (top_k,)),
+        ('weights', np.float32, (top_k,)),
+    ])
+
+
+def build_index(
+    user_ids: np.ndarray,
+    anime_ids: np.ndarray,
+    weights: np.ndarray,
+    top_k: int,
+) -> np.ndarray:
+    """Item-item косинусная близость по матрице пользователь x тайтл, top-K соседей на тайтл."""
+    positive = weights > 0
+    user_ids, anime_ids, weights = user_ids[positive], anime_ids[positive], weights[positive]
+
+    items, item_idx = np.unique(anime_ids, return_inverse=True)
+    users, user_idx = np.unique(user_ids, return_inverse=True)
+    if len(items) == 0:
+        return np.zeros(0, dtype=index_dtype(top_k))
+    matrix = sp.csr_matrix(
+        (weights.astype(np.float32), (user_idx, item_idx)),
+        shape=(len(users), len(items)),
+    )
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0))).ravel()
+    norms[norms == 0] = 1.0
+    normalized = matrix @ sp.diags(1.0 / norms)
+    similarity = (normalized.T @ normalized).tocsr()
+    similarity.setdiag(0)
+    similarity.eliminate_zeros()
+
+    index = np.zeros(len(items), dtype=index_dtype(top_k))
+    index['item'] = items
+    index['neighbors'] = -1
+    for row in range(len(items)):
+        start, end = similarity.indptr[row], similarity.indptr[row + 1]
+        cols, vals = similarity.indices[start:end], similarity.data[start:end]
+        if len(vals) > top_k:
+            best = np.argpartition(-vals, top_k)[:top_k]
+            cols, vals = cols[best], vals[best]
+        index['neighbors'][row, :len(cols)] = cols
+        index['weights'][row, :len(vals)] = vals
+    return index
+
+
+def save_index(index: np.ndarray, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f'.{os.getpid()}.tmp')
+    with open(tmp, 'wb') as f:
+        np.save(f, index)
+    os.replace(tmp, path)
+
+
+class ItemSimilarityIndex:
+    """Memory-mapped индекс соседей; перечитывается, когда задача сборки подменила файл."""
+
+    _CHECK_INTERVAL = 60.0
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._index: np.ndarray | None = None
+        self._mtime: float | None = None
+        self._checked_at = 0.0
+
+    def _current(self) -> np.ndarray | None:
+        now = time.monotonic()
+        if now - self._checked_at < self._CHECK_INTERVAL and self._index is not None:
+            return self._index
+        self._checked_at = now
+        try:
+            mtime = self.path.stat().st_mtime
+        except FileNotFoundError:
+            self._index, self._mtime = None, None
+            return None
+        if mtime != self._mtime:
+            self._index = np.load(self.path, mmap_mode='r')
+            self._mtime = mtime
+        return self._index
+
+    def recommend(self, seen: dict[int, float], limit: int) -> list[int]:
+        """anime_id по убыванию sum(вес записи * близость); seen — anime_id -> вес записи списка."""
+        index = self._current()
+        if index is None or len(index) == 0 or not seen:
+            return []
+
+        items = index['item']
+        seen_ids = np.fromiter(seen.keys(), dtype=np.int64, count=len(seen))
+        seen_weights = np.fromiter(seen.values(), dtype=np.float32, count=len(seen))
+        rows = np.searchsorted(items, seen_ids)
+        rows = np.minimum(rows, len(items) - 1)
+        known = items[rows] == seen_ids
+
+        neighbors = index['neighbors'][rows[known]]
+        contributions = index['weights'][rows[known]] * seen_weights[known, None]
+        valid = neighbors >= 0
+        scores = np.bincount(
+            neighbors[valid], weights=contributions[valid], minlength=len(items)
+        )
+        scores[rows[known]] = 0.0
+
+        limit = min(limit, int((scores > 0).sum()))
+        if limit == 0:
+            return []
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+        return items[top].tolist()
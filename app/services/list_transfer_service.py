@@ -0,0 +1,182 @@
+from collections.abc import AsyncIterator
+from typing import Optional, TypeVar
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+from pydantic import ValidationError
+
+from app.external.jikan_client import JIKAN_PAGE_SIZE
+from app.models.user_anime_list import WatchStatus
+from app.repositories.anime_repo import AnimeRepository
+from app.repositories.user_anime_list_repo import UserAnimeListRepository
+from app.schemas.user_anime_list import ListImportResponse, UserAnimeListCreate, UserAnimeListImport
+
+T = TypeVar('T')
+
+IMPORT_CHUNK_SIZE = 500
+
+# my_status в выгрузке MAL: текстом, а в старых выгрузках — числовым кодом
+_MAL_STATUSES = {
+    'watching': WatchStatus.WATCHING,
+    'completed': WatchStatus.COMPLETED,
+    'on-hold': WatchStatus.ON_HOLD,
+    'dropped': WatchStatus.DROPPED,
+    'plan to watch': WatchStatus.PLAN_TO_WATCH,
+    '1': WatchStatus.WATCHING,
+    '2': WatchStatus.COMPLETED,
+    '3': WatchStatus.ON_HOLD,
+    '4': WatchStatus.DROPPED,
+    '6': WatchStatus.PLAN_TO_WATCH,
+}
+_MAL_STATUS_NAMES = {
+    WatchStatus.WATCHING: 'Watching',
+    WatchStatus.COMPLETED: 'Completed',
+    WatchStatus.ON_HOLD: 'On-Hold',
+    WatchStatus.DROPPED: 'Dropped',
+    WatchStatus.PLAN_TO_WATCH: 'Plan to Watch',
+}
+
+
+def _mal_entry(element: ElementTree.Element) -> Optional[UserAnimeListImport]:
+    try:
+        score = float(element.findtext('my_score') or 0)
+        return UserAnimeListImport(
+            mal_id=int(element.findtext('series_animedb_id') or 0),
+            status=_MAL_STATUSES.get((element.findtext('my_status') or '').strip().lower()),
+            score=score or None,  # 0 в MAL — «без оценки»
+            progress=int(element.findtext('my_watched_episodes') or 0),
+        )
+    except (TypeError, ValueError):
+        return None
+
+
+async def parse_mal_xml(chunks: AsyncIterator[bytes]) -> AsyncIterator[Optional[UserAnimeListImport]]:
+    """Записи выгрузки MAL по мере чтения тела запроса; None — нераспознанная запись.
+
+    Разобранные <anime> сразу удаляются из дерева, так что память не растёт с размером файла.
+    ValueError — если это не XML.
+    """
+    parser = ElementTree.XMLPullParser(events=('start', 'end'))
+    root: Optional[ElementTree.Element] = None
+
+    def drain():
+        nonlocal root
+        for event, element in parser.read_events():
+            if event == 'start':
+                if root is None:
+                    root = element
+            elif element.tag == 'anime':
+                yield _mal_entry(element)
+                root.clear()
+
+    try:
+        async for chunk in chunks:
+            parser.feed(chunk)
+            for entry in drain():
+                yield entry
+        parser.close()
+        for entry in drain():
+            yield entry
+    except ElementTree.ParseError as e:
+        raise ValueError(f'invalid xml: {e}') from e
+
+
+async def parse_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[Optional[UserAnimeListImport]]:
+    """По одной UserAnimeListImport на строку; None — строка, которая не прошла валидацию."""
+    buffer = b''
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b'\n')
+        for line in lines:
+            if line.strip():
+                yield _json_entry(line)
+    if buffer.strip():
+        yield _json_entry(buffer)
+
+
+def _json_entry(line: bytes) -> Optional[UserAnimeListImport]:
+    try:
+        return UserAnimeListImport.model_validate_json(line)
+    except ValidationError:
+        return None
+
+
+async def _chunked(items: AsyncIterator[T], size: int) -> AsyncIterator[list[T]]:
+    chunk: list[T] = []
+    async for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class ListTransferService:
+    """Импорт списка из выгрузки MAL (XML) или NDJSON и потоковый экспорт обратно."""
+
+    def __init__(self, list_repo: UserAnimeListRepository, anime_repo: AnimeRepository):
+        self.list_repo = list_repo
+        self.anime_repo = anime_repo
+
+    async def import_entries(
+        self,
+        user_id: int,
+        entries: AsyncIterator[Optional[UserAnimeListImport]],
+    ) -> ListImportResponse:
+        """Пишет записи пачками; тайтлы, которых нет в базе, уходят в задачу синхронизации.
+
+        Каждая пачка коммитится отдельно: при ошибке разбора посередине файла
+        уже записанное остаётся, повторный импорт того же файла идемпотентен.
+        """
+        from app.tasks.list_tasks import import_list_entries_task
+
+        imported = queued = skipped = 0
+        async for chunk in _chunked(entries, IMPORT_CHUNK_SIZE):
+            valid = [entry for entry in chunk if entry is not None]
+            skipped += len(chunk) - len(valid)
+
+            pending = await self.save_resolved(user_id, valid)
+            imported += len(valid) - len(pending)
+            queued += len(pending)
+            for start in range(0, len(pending), JIKAN_PAGE_SIZE):
+                batch = pending[start:start + JIKAN_PAGE_SIZE]
+                await import_list_entries_task.kiq(user_id, [entry.model_dump(mode='json') for entry in batch])
+
+        return ListImportResponse(imported=imported, queued=queued, skipped=skipped)
+
+    async def save_resolved(self, user_id: int, entries: list[UserAnimeListImport]) -> list[UserAnimeListImport]:
+        """Записывает записи для тайтлов, которые уже есть в базе; возвращает остальные."""
+        ids = await self.anime_repo.get_ids_by_mal_ids({entry.mal_id for entry in entries})
+        await self.list_repo.bulk_upsert(user_id, [
+            UserAnimeListCreate(
+                anime_id=ids[entry.mal_id],
+                status=entry.status,
+                score=entry.score,
+                progress=entry.progress,
+            )
+            for entry in entries
+            if entry.mal_id in ids
+        ])
+        return [entry for entry in entries if entry.mal_id not in ids]
+
+    async def export_ndjson(self, user_id: int) -> AsyncIterator[str]:
+        async for mal_id, _, status, score, progress in self.list_repo.stream_export(user_id):
+            entry = UserAnimeListImport(mal_id=mal_id, status=status, score=score, progress=progress)
+            yield entry.model_dump_json() + '\n'
+
+    async def export_mal_xml(self, user_id: int) -> AsyncIterator[str]:
+        """Формат выгрузки MAL, который понимает их импорт (и наш)."""
+        yield '<?xml version="1.0" encoding="UTF-8" ?>\n<myanimelist>\n'
+        async for mal_id, title, status, score, progress in self.list_repo.stream_export(user_id):
+            yield (
+                '\t<anime>\n'
+                f'\t\t<series_animedb_id>{mal_id}</series_animedb_id>\n'
+                f'\t\t<series_title>{escape(title)}</series_title>\n'
+                f'\t\t<my_watched_episodes>{progress or 0}</my_watched_episodes>\n'
+                f'\t\t<my_score>{round(score) if score is not None else 0}</my_score>\n'
+                f'\t\t<my_status>{_MAL_STATUS_NAMES[status]}</my_status>\n'
+                '\t\t<update_on_import>1</update_on_import>\n'
+                '\t</anime>\n'
+            )
+        yield '</myanimelist>\n'
@@ -0,0 +1,106 @@
+from fastapi import HTTPException, status
+from redis.asyncio import Redis
+
+from app.config import settings
+
+# Скользящее окно (счётчики текущего и предыдущего окна с весом) и экспоненциальная
+# блокировка в одном хэше на субъект; время из Redis (TIME), как в token bucket.
+# ARGV: limit, window_ms, lock_base_ms, lock_max_ms, hit (1 — засчитать попытку).
+# Возвращает 0, если попытка разрешена, иначе сколько миллисекунд до разблокировки.
+# Блокировку (и рост уровня) включает только засчитанная попытка, дошедшая до limit;
+# окно при этом обнуляется, чтобы по истечении блокировки субъект начинал с чистого счёта.
+_SLIDING_WINDOW_LUA = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local lock_base = tonumber(ARGV[3])
+local lock_max = tonumber(ARGV[4])
+local hit = ARGV[5] == '1'
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+
+local state = redis.call('HMGET', KEYS[1], 'win', 'curr', 'prev', 'locked_until', 'level')
+local locked_until = tonumber(state[4]) or 0
+if locked_until > now then
+    return locked_until - now
+end
+
+local idx = math.floor(now / window)
+local win = tonumber(state[1])
+local curr = tonumber(state[2]) or 0
+local prev = tonumber(state[3]) or 0
+if win ~= idx then
+    if win == idx - 1 then prev = curr else prev = 0 end
+    curr = 0
+end
+local count = prev * (1 - (now % window) / window) + curr
+
+local level = tonumber(state[5]) or 0
+if hit then
+    curr = curr + 1
+    if count + 1 >= limit then
+        level = level + 1
+        locked_until = now + math.min(lock_base * 2 ^ (level - 1), lock_max)
+        curr = 0
+        prev = 0
+    end
+end
+
+redis.call('HSET', KEYS[1], 'win', idx, 'curr', curr, 'prev', prev,
+    'locked_until', locked_until, 'level', level)
+-- уровень блокировки помним сутки, иначе хватает двух окон
+if level > 0 then
+    redis.call('PEXPIRE', KEYS[1], 86400000)
+else
+    redis.call('PEXPIRE', KEYS[1], window * 2)
+end
+return 0
+"""
+
+
+class LoginThrottle:
+    """Ограничение попыток логина до похода в БД и bcrypt.
+
+    По IP считается каждая попытка, по email — только неудачные. Превышение
+    лимита включает блокировку субъекта, которая удваивается при повторах.
+    """
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+        self._script = redis.register_script(_SLIDING_WINDOW_LUA)
+
+    @staticmethod
+    def _email_key(email: str) -> str:
+        return f"throttle:login:email:{email.strip().lower()}"
+
+    async def _call(self, key: str, limit: int, window: int, hit: bool) -> int:
+        return int(await self._script(
+            keys=[key],
+            args=[
+                limit,
+                window * 1000,
+                settings.login_lockout_base * 1000,
+                settings.login_lockout_max * 1000,
+                1 if hit else 0,
+            ],
+        ))
+
+    async def check(self, email: str, client_ip: str | None) -> None:
+        wait_ms = await self._call(
+            self._email_key(email), settings.login_email_limit, settings.login_email_window, hit=False
+        )
+        if client_ip is not None:
+            wait_ms = max(wait_ms, await self._call(
+                f"throttle:login:ip:{client_ip}", settings.login_ip_limit, settings.login_ip_window, hit=True
+            ))
+        if wait_ms > 0:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many login attempts, try again later",
+                headers={"Retry-After": str(-(-wait_ms // 1000))},
+            )
+
+    async def record_failure(self, email: str) -> None:
+        await self._call(self._email_key(email), settings.login_email_limit, settings.login_email_window, hit=True)
+
+    async def reset(self, email: str) -> None:
+        await self.redis.delete(self._email_key(email))
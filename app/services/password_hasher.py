@@ -0,0 +1,95 @@
+import asyncio
+import os
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, TypeVar
+
+import structlog
+from fastapi import HTTPException, status
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.config import settings
+from app.utils import metrics
+from app.utils.security import hash_password, verify_password
+
+logger = structlog.get_logger(__name__)
+
+T = TypeVar('T')
+
+
+class PasswordHasher:
+    """bcrypt вне event loop: пул потоков (bcrypt отпускает GIL) с ограниченной очередью.
+
+    Одновременно считается не больше workers хэшей, ещё до max_pending ждут
+    своей очереди; сверх этого — 503, чтобы всплеск логинов не копил
+    бесконечную очередь и не съедал CPU у остальных запросов воркера.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._redis: Optional[Redis] = None
+        self._dummy_hash: Optional[str] = None
+
+    async def start(self, redis: Redis) -> None:
+        self._redis = redis
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='bcrypt')
+
+    async def stop(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._redis = None
+
+    async def hash(self, plain: str) -> str:
+        return await self._run(hash_password, plain)
+
+    async def verify(self, plain: str, hashed: str) -> bool:
+        return await self._run(verify_password, plain, hashed)
+
+    async def verify_dummy(self, plain: str) -> None:
+        """Та же работа, что verify, для несуществующего email — ответ не выдаёт по времени, есть ли аккаунт."""
+        if self._dummy_hash is None:
+            self._dummy_hash = await self.hash('dummy-password-for-timing')
+        await self.verify(plain, self._dummy_hash)
+
+    async def _run(self, fn: Callable[..., T], *args: str) -> T:
+        if self.pending >= self.max_pending:
+            await self._record('rejected')
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many concurrent authentication requests",
+                headers={"Retry-After": "1"},
+            )
+
+        self.pending += 1
+        queued = self.pending > self.workers
+        started = time.perf_counter()
+        try:
+            # без start() (скрипты, миграции) — дефолтный executor loop'а
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self.pending -= 1
+            await self._record('queued' if queued else 'immediate', started)
+
+    async def _record(self, outcome: str, started: Optional[float] = None) -> None:
+        # зовётся из finally: сбой Redis не должен ни ронять логин, ни подменять исключение хэша
+        if self._redis is None:
+            return
+        try:
+            await metrics.incr(self._redis, 'password_hash', outcome)
+            if started is not None:
+                # общее время с ожиданием в очереди; queued/immediate показывают глубину очереди
+                await metrics.incr_float(self._redis, 'password_hash', 'total_ms', (time.perf_counter() - started) * 1000)
+        except (RedisError, OSError) as e:
+            logger.warning("password_hash_metrics_failed", outcome=outcome, error=str(e))
+
+
+password_hasher = PasswordHasher(
+    workers=settings.password_hash_workers or min(4, os.cpu_count() or 1),
+    max_pending=settings.password_hash_max_pending,
+)
@@ -0,0 +1,53 @@
+import json
+from pathlib import Path
+
+from redis.asyncio import Redis
+
+from app.config import settings
+from app.models.anime import Anime
+from app.repositories.anime_repo import AnimeRepository
+from app.repositories.user_anime_list_repo import UserAnimeListRepository
+from app.services.item_similarity import ItemSimilarityIndex
+
+# страховка на случай, если инвалидация не дошла (например, поменялись жанры тайтла)
+_CACHE_TTL = 60 * 60
+
+# индекс собирает build_item_similarity_task, воркеры API только читают его через mmap
+item_index = ItemSimilarityIndex(Path(settings.item_similarity_path))
+
+
+class RecommendationService:
+    """Рекомендации: item-item соседи по спискам, добор по affinity жанров.
+
+    Результат кэшируется в Redis до следующего изменения списка пользователя.
+    """
+
+    def __init__(self, repo: AnimeRepository, list_repo: UserAnimeListRepository, redis: Redis):
+        self.repo = repo
+        self.list_repo = list_repo
+        self.redis = redis
+
+    @staticmethod
+    def _key(user_id: int) -> str:
+        return f"recs:{user_id}"
+
+    async def get_for_user(self, user_id: int, limit: int) -> list[Anime]:
+        key = self._key(user_id)
+        cached = await self.redis.hget(key, str(limit))
+        if cached is not None:
+            return await self.repo.get_by_ids(json.loads(cached))
+
+        seen = await self.list_repo.get_weights(user_id)
+        animes = await self.repo.get_by_ids(item_index.recommend(seen, limit))
+        if len(animes) < limit:
+            # холодный старт или индекс ещё не собран — добираем по жанрам
+            known = {anime.id for anime in animes}
+            extra = await self.repo.get_recommendations(user_id=user_id, limit=limit)
+            animes += [anime for anime in extra if anime.id not in known][: limit - len(animes)]
+
+        await self.redis.hset(key, str(limit), json.dumps([anime.id for anime in animes]))
+        await self.redis.expire(key, _CACHE_TTL)
+        return animes
+
+    async def invalidate(self, user_id: int) -> None:
+        await self.redis.delete(self._key(user_id))
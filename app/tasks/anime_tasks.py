@@ -1,27 +1,58 @@
+from taskiq import Context, TaskiqDepends
+
+from app.config import settings
 from app.database import AsyncSessionLocal
-from app.external.jikan_client import JikanClient
 from app.repositories.anime_repo import AnimeRepository
 from app.services.anime_service import AnimeService
 from app.tasks.broker import broker
 
 
 @broker.task
-async def sync_anime_task(mal_id: int) -> None:
+async def sync_anime_task(mal_id: int, context: Context = TaskiqDepends()) -> None:
+    async with AsyncSessionLocal() as session:
+        service = AnimeService(
+            repo=AnimeRepository(session),
+            jikan=context.state.jikan,
+            redis=context.state.redis,
+        )
+        await service.sync_from_jikan(mal_id)
+
+
+@broker.task
+async def sync_anime_batch_task(mal_ids: list[int], context: Context = TaskiqDepends()) -> None:
     async with AsyncSessionLocal() as session:
-        jikan = JikanClient()
-        try:
-            service = AnimeService(repo=AnimeRepository(session), jikan=jikan)
-            await service.sync_from_jikan(mal_id)
-        finally:
-            await jikan.close()
+        service = AnimeService(
+            repo=AnimeRepository(session),
+            jikan=context.state.jikan,
+            redis=context.state.redis,
+        )
+        await service.sync_batch_from_jikan(mal_ids)
 
 
 @broker.task
-async def sync_top_anime_task(limit: int = 25) -> None:
-    jikan = JikanClient()
-    try:
-        top = await jikan.get_top_anime(limit=limit)
-        for item in top:
-            await sync_anime_task.kiq(item["mal_id"])
-    finally:
-        await jikan.close()
+async def sync_top_anime_task(limit: int = 25, context: Context = TaskiqDepends()) -> None:
+    # одна сессия на весь прогон, пачки по странице топа
+    async with AsyncSessionLocal() as session:
+        service = AnimeService(
+            repo=AnimeRepository(session),
+            jikan=context.state.jikan,
+            redis=context.state.redis,
+        )
+        await service.sync_top_from_jikan(limit)
+
+
+@broker.task(schedule=[{"cron": "*/10 * * * *"}])
+async def sync_stale_anime_task(context: Context = TaskiqDepends()) -> None:
+    async with AsyncSessionLocal() as session:
+        service = AnimeService(
+            repo=AnimeRepository(session),
+            jikan=context.state.jikan,
+            redis=context.state.redis,
+        )
+        await service.sync_stale_from_jikan(settings.sync_budget_per_run)
+
+
+@broker.task(schedule=[{"cron": "30 3 * * *"}])
+async def refresh_sync_priority_task() -> None:
+    async with AsyncSessionLocal() as session:
+        await AnimeRepository(session).refresh_sync_priority()
@@ -1,5 +1,29 @@
+import redis.asyncio as aioredis
+from taskiq import TaskiqEvents, TaskiqState
 from taskiq_redis import ListQueueBroker
 
 from app.config import settings
+from app.database import AsyncSessionLocal
+from app.external.jikan_client import JikanClient
+from app.repositories.catalog_cache import catalog_cache
+from app.repositories.genre_cache import genre_cache
 
 broker = ListQueueBroker(settings.redis_url)
+
+
+@broker.on_event(TaskiqEvents.WORKER_STARTUP)
+async def startup(state: TaskiqState) -> None:
+    # один Redis и один Jikan-клиент на воркер, а не на каждую задачу
+    state.redis = aioredis.from_url(settings.redis_url)
+    state.jikan = JikanClient(redis=state.redis)
+    await genre_cache.start(state.redis, AsyncSessionLocal)
+    # записи тайтлов из задач поднимают поколение каталога
+    await catalog_cache.start(state.redis)
+
+
+@broker.on_event(TaskiqEvents.WORKER_SHUTDOWN)
+async def shutdown(state: TaskiqState) -> None:
+    await catalog_cache.stop()
+    await genre_cache.stop()
+    await state.jikan.close()
+    await state.redis.aclose()
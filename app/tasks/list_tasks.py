@@ -0,0 +1,32 @@
+from taskiq import Context, TaskiqDepends
+
+from app.database import AsyncSessionLocal
+from app.repositories.anime_repo import AnimeRepository
+from app.repositories.user_anime_list_repo import UserAnimeListRepository
+from app.schemas.user_anime_list import UserAnimeListImport
+from app.services.anime_service import AnimeService
+from app.services.list_transfer_service import ListTransferService
+from app.services.recommendation_service import RecommendationService
+from app.tasks.broker import broker
+
+
+@broker.task
+async def import_list_entries_task(
+    user_id: int,
+    entries: list[dict],
+    context: Context = TaskiqDepends(),
+) -> None:
+    """Дописывает импортированные записи, тайтлов которых не было в базе: сначала тянет их из Jikan."""
+    batch = [UserAnimeListImport.model_validate(entry) for entry in entries]
+    async with AsyncSessionLocal() as session:
+        anime_repo = AnimeRepository(session)
+        list_repo = UserAnimeListRepository(session)
+        service = AnimeService(
+            repo=anime_repo,
+            jikan=context.state.jikan,
+            redis=context.state.redis,
+        )
+        await service.sync_batch_from_jikan([entry.mal_id for entry in batch])
+        # что Jikan так и не отдал, просто не попадёт в список
+        await ListTransferService(list_repo=list_repo, anime_repo=anime_repo).save_resolved(user_id, batch)
+        await RecommendationService(repo=anime_repo, list_repo=list_repo, redis=context.state.redis).invalidate(user_id)
@@ -0,0 +1,41 @@
+import asyncio
+from pathlib import Path
+
+import numpy as np
+import structlog
+from sqlalchemy import select
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.user_anime_list import UserAnimeList
+from app.repositories.user_anime_list_repo import entry_weight
+from app.services.item_similarity import build_index, save_index
+from app.tasks.broker import broker
+
+logger = structlog.get_logger(__name__)
+
+
+@broker.task(schedule=[{"cron": "0 4 * * *"}])
+async def build_item_similarity_task() -> None:
+    user_ids: list[int] = []
+    anime_ids: list[int] = []
+    weights: list[float] = []
+    async with AsyncSessionLocal() as session:
+        stmt = select(
+            UserAnimeList.user_id, UserAnimeList.anime_id, UserAnimeList.status, UserAnimeList.score
+        ).execution_options(yield_per=10_000)
+        async for user_id, anime_id, status, score in await session.stream(stmt):
+            user_ids.append(user_id)
+            anime_ids.append(anime_id)
+            weights.append(entry_weight(status, score))
+
+    # numpy/scipy большую часть времени отпускают GIL — не держим event loop воркера
+    index = await asyncio.to_thread(
+        build_index,
+        np.asarray(user_ids, dtype=np.int64),
+        np.asarray(anime_ids, dtype=np.int64),
+        np.asarray(weights, dtype=np.float32),
+        settings.item_similarity_top_k,
+    )
+    await asyncio.to_thread(save_index, index, Path(settings.item_similarity_path))
+    logger.info("item_similarity_built", items=len(index), entries=len(weights))
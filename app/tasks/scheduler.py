@@ -0,0 +1,8 @@
+from taskiq import TaskiqScheduler
+from taskiq.schedule_sources import LabelScheduleSource
+
+from app.tasks.broker import broker
+
+# Расписание берётся из schedule=[...] в декораторах задач.
+# Запускать ровно один процесс: taskiq scheduler app.tasks.scheduler:scheduler <модули задач>
+scheduler = TaskiqScheduler(broker, sources=[LabelScheduleSource(broker)])
@@ -0,0 +1,21 @@
+import base64
+import binascii
+import json
+from typing import Any
+
+
+def encode_cursor(*values: Any) -> str:
+    """Непрозрачный курсор keyset-пагинации из значений ключа сортировки последней строки."""
+    raw = json.dumps(values, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> list[Any]:
+    padded = cursor + '=' * (-len(cursor) % 4)
+    try:
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, ValueError) as e:
+        raise ValueError('invalid cursor') from e
+    if not isinstance(values, list):
+        raise ValueError('invalid cursor')
+    return values
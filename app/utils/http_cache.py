@@ -0,0 +1,39 @@
+import hashlib
+from typing import Any
+
+from fastapi import Request
+from redis.asyncio import Redis
+
+# Растёт при каждой записи тайтлов (sync из Jikan, создание через API) — часть ETag каталога
+CATALOG_VERSION_KEY = 'catalog:version'
+
+
+async def get_catalog_version(redis: Redis) -> int:
+    return int(await redis.get(CATALOG_VERSION_KEY) or 0)
+
+
+async def bump_catalog_version(redis: Redis) -> None:
+    await redis.incr(CATALOG_VERSION_KEY)
+
+
+def make_etag(*parts: Any) -> str:
+    # weak: тело при той же версии совпадает по смыслу, но не обязательно побайтно
+    digest = hashlib.blake2b('|'.join(map(str, parts)).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """If-None-Match совпал с etag (слабое сравнение, как требует RFC 9110 для GET)."""
+    header = request.headers.get('if-none-match')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    return etag.removeprefix('W/') in {tag.strip().removeprefix('W/') for tag in header.split(',')}
+
+
+def cache_headers(etag: str, max_age: int) -> dict[str, str]:
+    return {
+        'ETag': etag,
+        'Cache-Control': f'public, max-age={max_age}, stale-while-revalidate={max_age}',
+    }
@@ -1,44 +1,89 @@
+import time
 import uuid
+from collections import OrderedDict
 from datetime import datetime, timezone, timedelta
+from pathlib import Path
 from typing import Any
 
 import jwt
 from fastapi import HTTPException, status
+from jwt.algorithms import HMACAlgorithm, get_default_algorithms
 
 from app.config import settings
 
+_algorithm = get_default_algorithms()[settings.jwt_algorithm]
 
-def _create_token(user_id: int, token_type: str, expires_delta: timedelta) -> str:
+# HS* подписывает общим секретом; RS*/EdDSA — приватным ключом из PEM, а публичный
+# отдаётся в /.well-known/jwks.json, чтобы другие сервисы проверяли токены сами
+if isinstance(_algorithm, HMACAlgorithm):
+    _signing_key: Any = settings.jwt_secret
+    _verifying_key: Any = settings.jwt_secret
+else:
+    if not settings.jwt_private_key_path:
+        raise RuntimeError(f"для {settings.jwt_algorithm} нужен JWT_PRIVATE_KEY_PATH")
+    _signing_key = _algorithm.prepare_key(Path(settings.jwt_private_key_path).read_bytes())
+    _verifying_key = _signing_key.public_key()
+
+
+def _create_token(
+    user_id: int,
+    token_type: str,
+    expires_delta: timedelta,
+    session_id: str | None = None,
+    jti: str | None = None,
+) -> str:
     now = datetime.now(timezone.utc)
     payload: dict[str, Any] = {
         "sub": str(user_id),
-        "jti": str(uuid.uuid4()),
+        "jti": jti or str(uuid.uuid4()),
         "type": token_type,
         "iat": now,
         "exp": now + expires_delta,
     }
-    return jwt.encode(payload, settings.jwt_secret, algorithm=settings.jwt_algorithm)
+    if session_id is not None:
+        payload["sid"] = session_id
+    return jwt.encode(
+        payload,
+        _signing_key,
+        algorithm=settings.jwt_algorithm,
+        headers=None if isinstance(_algorithm, HMACAlgorithm) else {"kid": settings.jwt_key_id},
+    )
 
 
-def create_access_token(user_id: int) -> str:
+def create_access_token(user_id: int, session_id: str | None = None) -> str:
     return _create_token(
         user_id=user_id,
         token_type="access",
         expires_delta=timedelta(minutes=settings.access_token_expire_minutes),
+        session_id=session_id,
     )
 
 
-def create_refresh_token(user_id: int) -> str:
+def create_refresh_token(user_id: int, session_id: str, jti: str) -> str:
     return _create_token(
         user_id=user_id,
         token_type="refresh",
         expires_delta=timedelta(days=settings.refresh_token_expire_days),
+        session_id=session_id,
+        jti=jti,
     )
 
 
+# токен -> проверенные claims: клиент шлёт один и тот же access-токен десятки раз
+# в минуту. Отзыв здесь не учитывается — его проверяет вызывающий после decode_token.
+_verified: OrderedDict[str, dict[str, Any]] = OrderedDict()
+
+
 def decode_token(token: str) -> dict[str, Any]:
+    claims = _verified.get(token)
+    if claims is not None:
+        if claims["exp"] > time.time():
+            _verified.move_to_end(token)
+            return claims
+        del _verified[token]
+
     try:
-        return jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
+        claims = jwt.decode(token, _verifying_key, algorithms=[settings.jwt_algorithm])
     except jwt.ExpiredSignatureError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -51,3 +96,21 @@ def decode_token(token: str) -> dict[str, Any]:
             detail="Invalid token",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+    _verified[token] = claims
+    while len(_verified) > settings.jwt_decode_cache_size:
+        _verified.popitem(last=False)
+    return claims
+
+
+def forget_token(token: str) -> None:
+    _verified.pop(token, None)
+
+
+def jwks() -> dict[str, Any]:
+    """Публичные ключи в формате JWK Set; для HS* пусто — секрет не публикуется."""
+    if isinstance(_algorithm, HMACAlgorithm):
+        return {"keys": []}
+    key = _algorithm.to_jwk(_verifying_key, as_dict=True)
+    key.update(kid=settings.jwt_key_id, alg=settings.jwt_algorithm, use="sig")
+    return {"keys": [key]}
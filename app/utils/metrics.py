@@ -0,0 +1,96 @@
+import asyncio
+import contextlib
+
+import structlog
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+logger = structlog.get_logger(__name__)
+
+# Счётчики живут в Redis-хэшах metrics:<group>, чтобы суммироваться по всем воркерам
+_PREFIX = 'metrics:'
+
+
+async def incr(redis: Redis, group: str, field: str, amount: int = 1) -> None:
+    await redis.hincrby(f'{_PREFIX}{group}', field, amount)
+
+
+async def incr_float(redis: Redis, group: str, field: str, amount: float) -> None:
+    await redis.hincrbyfloat(f'{_PREFIX}{group}', field, amount)
+
+
+class LocalCounters:
+    """Счётчики группы в памяти воркера — для путей, где запись в Redis на каждый вызов дороже самой работы.
+
+    start() раз в interval переносит накопленное в metrics:<group> одним pipeline,
+    stop() останавливает это и сбрасывает остаток. Снимок /metrics отстаёт на interval.
+    """
+
+    def __init__(self, group: str):
+        self.group = group
+        self._values: dict[str, int | float] = {}
+        self._flusher: asyncio.Task | None = None
+
+    def incr(self, field: str, amount: int = 1) -> None:
+        self._values[field] = self._values.get(field, 0) + amount
+
+    def incr_float(self, field: str, amount: float) -> None:
+        self._values[field] = self._values.get(field, 0.0) + float(amount)
+
+    def start(self, redis: Redis, interval: float) -> None:
+        self._flusher = asyncio.create_task(self._flush_periodically(redis, interval))
+
+    async def stop(self, redis: Redis) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._flusher
+            self._flusher = None
+        with contextlib.suppress(RedisError, OSError):
+            await self.flush(redis)
+
+    async def flush(self, redis: Redis) -> None:
+        values, self._values = self._values, {}
+        if not values:
+            return
+        key = f'{_PREFIX}{self.group}'
+        try:
+            async with redis.pipeline(transaction=False) as pipe:
+                for field, amount in values.items():
+                    if isinstance(amount, float):
+                        pipe.hincrbyfloat(key, field, amount)
+                    else:
+                        pipe.hincrby(key, field, amount)
+                await pipe.execute()
+        except (RedisError, OSError):
+            # не теряем: вернётся в Redis следующим flush
+            for field, amount in values.items():
+                self._values[field] = self._values.get(field, 0) + amount
+            raise
+
+    async def _flush_periodically(self, redis: Redis, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.flush(redis)
+            except (RedisError, OSError) as e:
+                logger.warning("metrics_flush_failed", group=self.group, error=str(e))
+
+
+def _parse(value: bytes) -> int | float:
+    text = value.decode()
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+async def snapshot(redis: Redis) -> dict[str, dict[str, int | float]]:
+    result: dict[str, dict[str, int | float]] = {}
+    async for key in redis.scan_iter(match=f'{_PREFIX}*'):
+        name = key.decode() if isinstance(key, bytes) else key
+        values = await redis.hgetall(name)
+        result[name.removeprefix(_PREFIX)] = {
+            field.decode(): _parse(value) for field, value in values.items()
+        }
+    return result
@@ -0,0 +1,51 @@
+import asyncio
+from collections.abc import Awaitable, Callable
+
+import structlog
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+logger = structlog.get_logger(__name__)
+
+MessageHandler = Callable[[bytes], Awaitable[None]]
+
+
+async def _listen(
+    redis: Redis,
+    channel: str,
+    on_message: MessageHandler,
+    on_connect: Callable[[], Awaitable[None]] | None,
+    on_disconnect: Callable[[], Awaitable[None]] | None,
+) -> None:
+    while True:
+        pubsub = redis.pubsub()
+        try:
+            await pubsub.subscribe(channel)
+            # сообщения, пропущенные пока не были подписаны, наверстываем через on_connect
+            if on_connect is not None:
+                await on_connect()
+            async for message in pubsub.listen():
+                if message['type'] == 'message':
+                    await on_message(message['data'])
+        except asyncio.CancelledError:
+            raise
+        except (RedisError, OSError) as e:
+            logger.warning("pubsub_disconnected", channel=channel, error=str(e))
+        except Exception as e:
+            logger.exception("pubsub_handler_failed", channel=channel, error=str(e))
+        finally:
+            await pubsub.aclose()
+        if on_disconnect is not None:
+            await on_disconnect()
+        await asyncio.sleep(1)
+
+
+def start_listener(
+    redis: Redis,
+    channel: str,
+    on_message: MessageHandler,
+    on_connect: Callable[[], Awaitable[None]] | None = None,
+    on_disconnect: Callable[[], Awaitable[None]] | None = None,
+) -> asyncio.Task:
+    """Фоновая подписка на канал с переподключением; отменить — task.cancel()."""
+    return asyncio.create_task(_listen(redis, channel, on_message, on_connect, on_disconnect))
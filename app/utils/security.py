@@ -1,9 +1,19 @@
 import bcrypt
 
+from app.config import settings
+
 
 def hash_password(plain: str) -> str:
-    return bcrypt.hashpw(plain.encode(), bcrypt.gensalt()).decode()
+    return bcrypt.hashpw(plain.encode(), bcrypt.gensalt(rounds=settings.bcrypt_rounds)).decode()
 
 
 def verify_password(plain: str, hashed: str) -> bool:
     return bcrypt.checkpw(plain.encode(), hashed.encode())
+
+
+def needs_rehash(hashed: str) -> bool:
+    """Хэш сделан с другим cost, чем сейчас в настройках ($2b$<cost>$...)."""
+    try:
+        return int(hashed.split('$')[2]) != settings.bcrypt_rounds
+    except (IndexError, ValueError):
+        return True
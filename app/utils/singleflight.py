@@ -0,0 +1,44 @@
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any, TypeVar
+
+T = TypeVar('T')
+
+
+class SingleFlight:
+    """Схлопывает конкурентные вызовы с одинаковым ключом в один в пределах процесса.
+
+    Первый вызов (лидер) выполняет работу, остальные ждут его результат
+    или его исключение.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Future[Any]] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> tuple[T, bool]:
+        """Возвращает (результат, shared); shared=True — результат получен от чужого вызова."""
+        while (future := self._calls.get(key)) is not None:
+            try:
+                return await asyncio.shield(future), True
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # лидера отменили (клиент отвалился) — пробуем стать лидером сами
+
+        future = asyncio.get_running_loop().create_future()
+        # без ожидающих исключение лидера никто не заберёт — не даём asyncio ругаться
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._calls[key] = future
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            del self._calls[key]
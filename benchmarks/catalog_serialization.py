@@ -0,0 +1,75 @@
+"""Сериализация страницы каталога: ORM-объекты через response_model (как было) против строк через dump_json.
+
+    python -m benchmarks.catalog_serialization [--rows 100] [--genres 5] [--runs 200]
+
+Без базы: одна и та же страница в двух видах отдаётся из двух эндпоинтов
+мини-приложения через httpx ASGITransport, так что сравнивается ровно путь
+FastAPI от возврата из эндпоинта до байтов ответа.
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timezone
+
+from fastapi import FastAPI, Response
+from httpx import ASGITransport, AsyncClient
+
+from app.models.anime import Anime, AnimeSeason, AnimeStatus
+from app.models.genre import Genre
+from app.schemas.anime import AnimeResponse, anime_rows_json
+
+
+def make_page(rows: int, genres_per_title: int) -> tuple[list[Anime], list[dict]]:
+    now = datetime.now(timezone.utc)
+    genres = [Genre(id=i, name=f'Genre {i}', mal_id=i) for i in range(genres_per_title)]
+    animes = [
+        Anime(
+            id=i, mal_id=i, title=f'Title {i}', title_english=f'English {i}', title_japanese=None,
+            synopsis=' '.join(['Lorem ipsum dolor sit amet.'] * 20), score=7.5, episodes=12,
+            status=AnimeStatus.FINISHED, season=AnimeSeason.FALL, year=2020,
+            image_url=f'https://cdn.myanimelist.net/images/anime/{i}.jpg',
+            created_at=now, updated_at=now, genres=genres,
+        )
+        for i in range(rows)
+    ]
+    # ровно то, что отдаёт get_all_rows: колонки + genres из json_agg
+    dicts = [
+        {
+            **{field: getattr(anime, field) for field in AnimeResponse.model_fields if field != 'genres'},
+            'genres': [{'id': g.id, 'name': g.name, 'mal_id': g.mal_id} for g in genres],
+        }
+        for anime in animes
+    ]
+    return animes, dicts
+
+
+async def main(rows: int, genres_per_title: int, runs: int) -> None:
+    animes, dicts = make_page(rows, genres_per_title)
+    app = FastAPI()
+
+    @app.get('/orm', response_model=list[AnimeResponse])
+    async def orm():
+        return animes
+
+    @app.get('/rows', response_model=list[AnimeResponse])
+    async def page_rows():
+        return Response(content=anime_rows_json.dump_json(dicts), media_type='application/json')
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url='http://bench') as client:
+        orm_body = (await client.get('/orm')).json()
+        assert orm_body == (await client.get('/rows')).json(), 'ответы должны совпадать'
+        for name, url in (('response_model', '/orm'), ('rows dump_json', '/rows')):
+            started = time.perf_counter()
+            for _ in range(runs):
+                await client.get(url)
+            elapsed = (time.perf_counter() - started) * 1000
+            print(f'{name:>15}: {elapsed / runs:6.2f} ms/page')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100)
+    parser.add_argument('--genres', type=int, default=5)
+    parser.add_argument('--runs', type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.genres, args.runs))
@@ -0,0 +1,81 @@
+"""Round trips и время синка жанров: построчный upsert (как было) против set-based sync_genres.
+
+    python -m benchmarks.genre_sync [--titles 25] [--genres 8]
+
+Нужна база с применёнными миграциями (DATABASE_URL); всё пишется в транзакции,
+которая в конце откатывается.
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import delete, event, insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.config import settings
+from app.models.anime import Anime
+from app.models.genre import anime_genres
+from app.repositories.anime_repo import AnimeRepository
+from app.repositories.genre_repo import GenreInput
+
+
+async def legacy_sync_genres(repo: AnimeRepository, anime_id: int, genres: list[GenreInput]) -> None:
+    """sync_genres до перехода на bulk_upsert: запрос(ы) на жанр, delete-all, insert-all, refresh."""
+    anime = await repo.get_by_id(anime_id)
+    genre_ids = set()
+    for g in genres:
+        genre = await repo.genre_repo.upsert(name=g['name'], mal_id=g.get('mal_id'))
+        genre_ids.add(genre.id)
+    await repo.session.execute(delete(anime_genres).where(anime_genres.c.anime_id == anime_id))
+    if genre_ids:
+        await repo.session.execute(
+            insert(anime_genres), [{'anime_id': anime_id, 'genre_id': gid} for gid in genre_ids]
+        )
+    await repo.session.commit()
+    await repo.session.refresh(anime, attribute_names=['genres'])
+
+
+async def main(titles: int, genres_per_title: int) -> None:
+    engine = create_async_engine(settings.database_url, poolclass=NullPool)
+    statements = 0
+
+    @event.listens_for(engine.sync_engine, 'before_cursor_execute')
+    def count(*_):
+        nonlocal statements
+        statements += 1
+
+    genres = [{'name': f'Bench Genre {i}', 'mal_id': 900_000 + i} for i in range(genres_per_title)]
+    async with engine.connect() as conn:
+        await conn.begin()
+        async with AsyncSession(bind=conn, join_transaction_mode='create_savepoint') as session:
+            repo = AnimeRepository(session)
+            anime_ids = []
+            for i in range(titles):
+                anime = Anime(title=f'Bench {i}', mal_id=900_000 + i)
+                session.add(anime)
+                await session.flush()
+                anime_ids.append(anime.id)
+            await repo.sync_genres(anime_ids[0], genres)  # жанры уже в базе, как при ресинке
+
+            runs = (
+                ('per-genre upsert', lambda anime_id: legacy_sync_genres(repo, anime_id, genres)),
+                ('bulk sync_genres', lambda anime_id: repo.sync_genres(anime_id, genres)),
+            )
+            for name, sync in runs:
+                statements = 0
+                started = time.perf_counter()
+                for anime_id in anime_ids:
+                    await sync(anime_id)
+                elapsed = (time.perf_counter() - started) * 1000
+                print(f'{name:>18}: {statements / titles:5.1f} round trips/title, {elapsed / titles:6.2f} ms/title')
+        await conn.rollback()
+    await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--titles', type=int, default=25)
+    parser.add_argument('--genres', type=int, default=8)
+    args = parser.parse_args()
+    asyncio.run(main(args.titles, args.genres))
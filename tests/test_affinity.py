@@ -0,0 +1,61 @@
+import pytest
+from sqlalchemy import select
+
+from app.models.anime import Anime
+from app.models.user import User
+from app.models.user_anime_list import WatchStatus
+from app.models.user_genre_affinity import UserGenreAffinity
+from app.repositories.anime_repo import AnimeRepository
+from app.repositories.user_anime_list_repo import UserAnimeListRepository, entry_weight
+from app.schemas.user_anime_list import UserAnimeListCreate
+
+
+async def _affinity(session, user_id: int) -> dict[str, float]:
+    from app.models.genre import Genre
+
+    rows = await session.execute(
+        select(Genre.name, UserGenreAffinity.weight)
+        .join(Genre, Genre.id == UserGenreAffinity.genre_id)
+        .where(UserGenreAffinity.user_id == user_id)
+    )
+    return {name: weight for name, weight in rows if abs(weight) > 1e-9}
+
+
+@pytest.fixture
+async def user_with_title(session):
+    """Пользователь, у которого в списке тайтл, созданный ещё без жанров."""
+    user = User(email='affinity@example.com', hashed_password='x')
+    anime = Anime(title='Test', mal_id=1)
+    session.add_all([user, anime])
+    await session.flush()
+    user_id, anime_id = user.id, anime.id
+    await UserAnimeListRepository(session).add(
+        user_id, UserAnimeListCreate(anime_id=anime_id, status=WatchStatus.COMPLETED, score=9)
+    )
+    return user_id, anime_id
+
+
+async def test_genres_synced_after_list_entry_shift_affinity(session, user_with_title):
+    user_id, anime_id = user_with_title
+    repo = AnimeRepository(session)
+    weight = entry_weight(WatchStatus.COMPLETED, 9)
+
+    await repo.sync_genres(anime_id, [{'name': 'Action', 'mal_id': 1}, {'name': 'Drama', 'mal_id': 8}])
+    assert await _affinity(session, user_id) == pytest.approx({'Action': weight, 'Drama': weight})
+
+    # ресинк: Drama ушла, пришла Comedy — Action не трогается
+    await repo.sync_genres(anime_id, [{'name': 'Action', 'mal_id': 1}, {'name': 'Comedy', 'mal_id': 4}])
+    assert await _affinity(session, user_id) == pytest.approx({'Action': weight, 'Comedy': weight})
+
+    # удаление записи после смены жанров не уводит вес в минус
+    await UserAnimeListRepository(session).delete(user_id, anime_id)
+    assert await _affinity(session, user_id) == {}
+
+
+async def test_anime_delete_removes_its_affinity(session, user_with_title):
+    user_id, anime_id = user_with_title
+    repo = AnimeRepository(session)
+    await repo.sync_genres(anime_id, [{'name': 'Action', 'mal_id': 1}])
+
+    assert await repo.delete(anime_id)
+    assert await _affinity(session, user_id) == {}
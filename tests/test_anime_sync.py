@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta, timezone
+
+import httpx
+from sqlalchemy import select, update
+
+from app.models.anime import Anime
+from app.repositories.anime_repo import AnimeRepository
+from app.services.anime_service import AnimeService
+
+
+class StubJikan:
+    def __init__(self, payloads: dict[int, dict | Exception]):
+        self.payloads = payloads
+
+    async def get_anime_by_id(self, mal_id: int) -> dict:
+        payload = self.payloads[mal_id]
+        if isinstance(payload, Exception):
+            raise payload
+        return payload
+
+
+def _payload(mal_id: int, score: float) -> dict:
+    return {
+        'mal_id': mal_id,
+        'title': f'Title {mal_id}',
+        'score': score,
+        'status': 'Finished Airing',
+        'genres': [{'name': 'Action', 'mal_id': 1}],
+    }
+
+
+async def _sync_times(session) -> dict[int, tuple[datetime, datetime]]:
+    rows = await session.execute(select(Anime.mal_id, Anime.last_synced_at, Anime.updated_at))
+    return {mal_id: (synced, updated) for mal_id, synced, updated in rows}
+
+
+async def test_unchanged_titles_are_stamped_without_touching_updated_at(session):
+    service = AnimeService(repo=AnimeRepository(session), jikan=StubJikan({1: _payload(1, 7.0), 2: _payload(2, 8.0)}))
+    await service.sync_batch_from_jikan([1, 2])
+    week_ago = datetime.now(timezone.utc) - timedelta(days=7)
+    await session.execute(update(Anime).values(last_synced_at=week_ago, updated_at=week_ago))
+
+    service.jikan.payloads[2] = _payload(2, 8.5)
+    ids = await service.sync_batch_from_jikan([1, 2])
+
+    assert set(ids) == {1, 2}
+    times = await _sync_times(session)
+    # 1 не изменился: отмечен синк, updated_at прежний; 2 переписан целиком
+    assert times[1][0] > week_ago and times[1][1] == week_ago
+    assert times[2][0] > week_ago and times[2][1] > week_ago
+
+
+async def test_single_unchanged_title_is_stamped(session):
+    service = AnimeService(repo=AnimeRepository(session), jikan=StubJikan({1: _payload(1, 7.0)}))
+    await service.sync_from_jikan(1)
+    week_ago = datetime.now(timezone.utc) - timedelta(days=7)
+    await session.execute(update(Anime).values(last_synced_at=week_ago, updated_at=week_ago))
+
+    anime = await service.sync_from_jikan(1)
+
+    assert anime.mal_id == 1 and [g.name for g in anime.genres] == ['Action']
+    synced, updated = (await _sync_times(session))[1]
+    assert synced > week_ago and updated == week_ago
+
+
+async def test_failed_fetch_is_claimed_again_after_lease(session):
+    service = AnimeService(repo=AnimeRepository(session), jikan=StubJikan({1: _payload(1, 7.0), 2: _payload(2, 8.0)}))
+    await service.sync_batch_from_jikan([1, 2])
+    long_ago = datetime.now(timezone.utc) - timedelta(days=60)
+    await session.execute(update(Anime).values(last_synced_at=long_ago))
+
+    service.jikan.payloads[2] = httpx.ConnectTimeout('timeout')
+    assert await service.sync_stale_from_jikan(budget=10) == 1
+
+    times = await _sync_times(session)
+    # упавший fetch не считается синком: last_synced_at прежний
+    assert times[1][0] > long_ago and times[2][0] == long_ago
+    # пока аренда не истекла, параллельный прогон его не берёт
+    assert await service.repo.claim_stale(10) == []
+
+    await session.execute(update(Anime).values(sync_claimed_at=Anime.sync_claimed_at - timedelta(hours=1)))
+    assert await service.repo.claim_stale(10) == [2]
@@ -0,0 +1,108 @@
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app.repositories.refresh_sessions import RefreshSessionStore, RotateResult
+from app.repositories.user_repo import UserRepository
+from app.services.auth_service import AuthService
+from app.utils.jwt import _create_token
+
+TTL = 3600
+
+
+async def test_rotation_and_reuse_kill_the_session(redis):
+    store = RefreshSessionStore(redis)
+    await store.create(1, 'phone', 'jti-1', TTL)
+
+    assert await store.rotate(1, 'phone', 'jti-1', 'jti-2', TTL) is RotateResult.ROTATED
+    assert await store.rotate(1, 'phone', 'jti-2', 'jti-3', TTL) is RotateResult.ROTATED
+
+    # jti-2 уже ротирован: второй раз его предъявляет кто-то другой
+    assert await store.rotate(1, 'phone', 'jti-2', 'jti-4', TTL) is RotateResult.REUSED
+    # сессия убита целиком — и актуальный jti-3 больше не работает
+    assert await store.rotate(1, 'phone', 'jti-3', 'jti-5', TTL) is RotateResult.NOT_FOUND
+
+
+async def test_revoke_is_per_device_and_revoke_all_is_not(redis):
+    store = RefreshSessionStore(redis)
+    await store.create(1, 'phone', 'p-1', TTL)
+    await store.create(1, 'laptop', 'l-1', TTL)
+    await store.create(2, 'phone', 'o-1', TTL)
+
+    await store.revoke(1, 'phone')
+    assert await store.rotate(1, 'phone', 'p-1', 'p-2', TTL) is RotateResult.NOT_FOUND
+    assert await store.rotate(1, 'laptop', 'l-1', 'l-2', TTL) is RotateResult.ROTATED
+
+    await store.revoke_all(1)
+    assert await store.rotate(1, 'laptop', 'l-2', 'l-3', TTL) is RotateResult.NOT_FOUND
+    assert await store.rotate(2, 'phone', 'o-1', 'o-2', TTL) is RotateResult.ROTATED
+
+
+async def test_legacy_refresh_token_without_sid_is_not_found(session, redis):
+    service = AuthService(user_repo=UserRepository(session), redis=redis)
+    legacy = _create_token(1, 'refresh', timedelta(days=1))
+
+    with pytest.raises(HTTPException) as e:
+        await service.refresh(legacy)
+
+    assert e.value.status_code == 401
+    assert e.value.detail == 'Refresh token not found, please login again'
+
+
+async def _register(client, email: str) -> dict[str, str]:
+    response = await client.post('/auth/register', json={'email': email, 'password': 'password1'})
+    assert response.status_code == 201
+    return response.json()
+
+
+def _bearer(token: str) -> dict[str, str]:
+    return {'Authorization': f'Bearer {token}'}
+
+
+async def test_reuse_revokes_access_tokens_of_the_session(client):
+    first = await _register(client, 'reuse@example.com')
+    rotated = (await client.post('/auth/refresh', json={'refresh_token': first['refresh_token']})).json()
+    assert (await client.get('/users/me', headers=_bearer(rotated['access_token']))).status_code == 200
+
+    reused = await client.post('/auth/refresh', json={'refresh_token': first['refresh_token']})
+
+    assert reused.status_code == 401
+    for tokens in (first, rotated):
+        assert (await client.get('/users/me', headers=_bearer(tokens['access_token']))).status_code == 401
+    refreshed = await client.post('/auth/refresh', json={'refresh_token': rotated['refresh_token']})
+    assert refreshed.status_code == 401
+
+
+async def test_logout_leaves_other_devices_alone(client):
+    phone = await _register(client, 'devices@example.com')
+    laptop = (await client.post('/auth/login', json={'email': 'devices@example.com', 'password': 'password1'})).json()
+    rotated = (await client.post('/auth/refresh', json={'refresh_token': phone['refresh_token']})).json()
+
+    assert (await client.post('/auth/logout', headers=_bearer(rotated['access_token']))).status_code == 200
+
+    # токен телефона до ротации тоже отозван — по sid
+    assert (await client.get('/users/me', headers=_bearer(phone['access_token']))).status_code == 401
+    assert (await client.get('/users/me', headers=_bearer(laptop['access_token']))).status_code == 200
+    assert (await client.post('/auth/refresh', json={'refresh_token': laptop['refresh_token']})).status_code == 200
+
+
+async def test_deactivate_drops_cached_principal_everywhere(client, redis):
+    from app.repositories.user_cache import user_cache
+
+    await user_cache.start(redis)
+    credentials = {'email': 'deactivate@example.com', 'password': 'password1'}
+    phone = await _register(client, credentials['email'])
+    laptop = (await client.post('/auth/login', json=credentials)).json()
+    # принципал ноутбука уже в кэше — без инвалидации он бы ещё ходил активным
+    assert (await client.get('/users/me', headers=_bearer(laptop['access_token']))).status_code == 200
+    user_id = (await client.get('/users/me', headers=_bearer(phone['access_token']))).json()['id']
+    assert await redis.exists(f'user:principal:{user_id}')
+
+    assert (await client.post('/auth/deactivate', headers=_bearer(phone['access_token']))).status_code == 200
+
+    assert not await redis.exists(f'user:principal:{user_id}')
+    me = await client.get('/users/me', headers=_bearer(laptop['access_token']))
+    assert me.status_code == 403 and me.json()['detail'] == 'Account is inactive'
+    assert (await client.post('/auth/refresh', json={'refresh_token': laptop['refresh_token']})).status_code == 401
+    assert (await client.post('/auth/login', json=credentials)).status_code == 403
@@ -0,0 +1,37 @@
+from app.repositories.catalog_cache import CatalogCache, CatalogPage
+from app.schemas.anime import CatalogQuery
+from app.utils import metrics
+
+
+async def test_hits_are_counted_in_memory_until_flush(redis):
+    cache = CatalogCache()
+    await cache.start(redis)
+    loads = []
+
+    async def load() -> CatalogPage:
+        loads.append(True)
+        return CatalogPage(body=b'[]', next_cursor=None)
+
+    for _ in range(3):
+        assert await cache.get_or_load(1, CatalogQuery(), load) == CatalogPage(body=b'[]', next_cursor=None)
+
+    assert len(loads) == 1
+    assert await redis.exists('metrics:catalog_cache') == 0
+
+    await cache.stop()
+    counters = (await metrics.snapshot(redis))['catalog_cache']
+    assert counters['miss'] == 1
+    assert counters['local_hit'] == 2
+    assert counters['hit_ms'] >= 0
+
+
+async def test_flush_adds_to_counters_of_other_workers(redis):
+    await metrics.incr(redis, 'catalog_cache', 'miss', 5)
+    counters = metrics.LocalCounters('catalog_cache')
+    counters.incr('miss')
+    counters.incr_float('miss_ms', 1.5)
+
+    await counters.flush(redis)
+    await counters.flush(redis)
+
+    assert (await metrics.snapshot(redis))['catalog_cache'] == {'miss': 6, 'miss_ms': 1.5}
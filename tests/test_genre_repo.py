@@ -0,0 +1,95 @@
+from sqlalchemy import select, update
+
+from app.models.anime import Anime
+from app.models.genre import Genre
+from app.repositories.anime_repo import AnimeRepository
+from app.repositories.genre_cache import genre_cache
+from app.repositories.genre_repo import GenreRepository
+
+
+async def test_bulk_upsert_inserts_and_renames_by_mal_id(session):
+    repo = GenreRepository(session)
+    first = await repo.bulk_upsert([{'name': 'action', 'mal_id': 1}, {'name': 'Comedy', 'mal_id': 4}])
+    second = await repo.bulk_upsert([{'name': 'Action ', 'mal_id': 1}, {'name': 'Comedy Drama', 'mal_id': 4}])
+
+    assert second['Action'] == first['Action']
+    assert second['Comedy Drama'] == first['Comedy']
+
+
+async def test_bulk_upsert_reuses_row_with_same_name_and_no_mal_id(session):
+    session.add(Genre(name='Action', mal_id=None))
+    await session.flush()
+    existing = (await session.scalars(select(Genre).where(Genre.name == 'Action'))).one()
+
+    result = await GenreRepository(session).bulk_upsert([{'name': 'action', 'mal_id': 1}])
+
+    assert result == {'Action': existing.id}
+    assert existing.mal_id == 1
+
+
+async def test_bulk_upsert_reuses_row_with_same_name_and_other_mal_id(session):
+    session.add(Genre(name='Drama', mal_id=8))
+    await session.flush()
+
+    result = await GenreRepository(session).bulk_upsert(
+        [{'name': 'Drama', 'mal_id': 99}, {'name': 'Comedy', 'mal_id': 4}]
+    )
+
+    drama = (await session.scalars(select(Genre).where(Genre.name == 'Drama'))).one()
+    assert result['Drama'] == drama.id
+    assert drama.mal_id == 8
+    assert 'Comedy' in result
+
+
+async def test_genre_changes_published_only_after_commit(session, monkeypatch):
+    published = []
+
+    async def publish_changed():
+        published.append(True)
+
+    monkeypatch.setattr(genre_cache, 'publish_changed', publish_changed)
+    anime = Anime(title='Test', mal_id=1)
+    session.add(anime)
+    await session.flush()
+    repo = AnimeRepository(session)
+
+    await repo.genre_repo.bulk_upsert([{'name': 'Action', 'mal_id': 1}])
+    assert published == []
+
+    await repo.sync_genres(anime.id, [{'name': 'Action', 'mal_id': 1}])
+    assert len(published) == 1
+
+
+async def test_genre_relink_and_rename_change_detail_etag(client, session):
+    from datetime import datetime, timedelta, timezone
+
+    week_ago = datetime.now(timezone.utc) - timedelta(days=7)
+    anime = Anime(title='Test', mal_id=1, created_at=week_ago, updated_at=week_ago)
+    session.add(anime)
+    await session.flush()
+    anime_id = anime.id
+    repo = AnimeRepository(session)
+    await repo.sync_genres(anime_id, [{'name': 'Action', 'mal_id': 1}])
+
+    async def etag_after_change() -> str:
+        etag = (await client.get(f'/anime/{anime_id}')).headers['ETag']
+        assert (await client.get(f'/anime/{anime_id}', headers={'If-None-Match': etag})).status_code == 304
+        # состояние «неделю назад» — следующее изменение обязано дать новый ETag
+        await session.execute(update(Anime).where(Anime.id == anime_id).values(updated_at=week_ago))
+        return (await client.get(f'/anime/{anime_id}')).headers['ETag']
+
+    etag = await etag_after_change()
+
+    await repo.sync_genres(anime_id, [{'name': 'Action', 'mal_id': 1}, {'name': 'Drama', 'mal_id': 8}])
+    response = await client.get(f'/anime/{anime_id}', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert sorted(g['name'] for g in response.json()['genres']) == ['Action', 'Drama']
+
+    etag = await etag_after_change()
+
+    # Jikan переименовал жанр: связи те же, тело другое
+    await GenreRepository(session).bulk_upsert([{'name': 'Action Adventure', 'mal_id': 1}])
+    await session.commit()
+    response = await client.get(f'/anime/{anime_id}', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert sorted(g['name'] for g in response.json()['genres']) == ['Action Adventure', 'Drama']
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from app.services.item_similarity import ItemSimilarityIndex, build_index, save_index
+
+# пользователь x тайтл: 10 и 20 смотрели одни и те же (cos 1), 30 пересекается
+# с ними наполовину (cos 1/2) и с 40 на 1/√2; 50 только с отрицательным весом
+USERS = np.array([1, 1, 2, 2, 2, 3, 3, 1])
+ITEMS = np.array([10, 20, 10, 20, 30, 30, 40, 50])
+WEIGHTS = np.array([1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 2.0, -1.0])
+
+
+def _neighbors(index: np.ndarray, item: int) -> dict[int, float]:
+    row = index[np.searchsorted(index['item'], item)]
+    return {
+        int(index['item'][col]): float(weight)
+        for col, weight in zip(row['neighbors'], row['weights'])
+        if col >= 0
+    }
+
+
+def test_build_index_cosine_neighbors():
+    index = build_index(USERS, ITEMS, WEIGHTS, top_k=3)
+
+    # тайтл только с отрицательными весами в индекс не попадает
+    assert index['item'].tolist() == [10, 20, 30, 40]
+    assert _neighbors(index, 10) == pytest.approx({20: 1.0, 30: 0.5})
+    assert _neighbors(index, 30) == pytest.approx({10: 0.5, 20: 0.5, 40: 2 ** -0.5})
+    assert _neighbors(index, 40) == pytest.approx({30: 2 ** -0.5})
+
+
+def test_build_index_keeps_top_k():
+    index = build_index(USERS, ITEMS, WEIGHTS, top_k=1)
+
+    assert _neighbors(index, 10) == pytest.approx({20: 1.0})
+    assert _neighbors(index, 30) == pytest.approx({40: 2 ** -0.5})
+
+
+def test_build_index_empty():
+    assert len(build_index(np.array([1]), np.array([10]), np.array([-1.0]), top_k=3)) == 0
+
+
+def test_recommend_from_saved_index(tmp_path):
+    path = tmp_path / 'items.npy'
+    save_index(build_index(USERS, ITEMS, WEIGHTS, top_k=3), path)
+    index = ItemSimilarityIndex(path)
+
+    # уже просмотренное не рекомендуется, вклад соседей взвешен весом записи
+    assert index.recommend({10: 1.0}, limit=5) == [20, 30]
+    assert index.recommend({10: 1.0, 40: 2.0}, limit=5) == [30, 20]
+    assert index.recommend({999: 1.0}, limit=5) == []
@@ -0,0 +1,29 @@
+import asyncio
+import json
+import time
+
+import httpx
+from structlog.testing import capture_logs
+
+from app.external.jikan_cache import POLICIES, JikanResponseCache
+
+
+async def test_failed_background_revalidation_is_logged_and_keeps_stale(redis):
+    cache = JikanResponseCache(redis)
+    policy = POLICIES['full']
+    key = 'jikan:cache:anime/1/full?'
+    stale = {'body': {'mal_id': 1}, 'etag': '"v1"', 'fetched_at': time.time() - policy.ttl - 1}
+    await redis.set(key, json.dumps(stale))
+
+    async def fetch(endpoint, params, headers):
+        raise httpx.ConnectTimeout('timeout')
+
+    with capture_logs() as logs:
+        assert await cache.get('full', 'anime/1/full', {}, fetch) == {'mal_id': 1}
+        await asyncio.gather(*cache._background)
+
+    assert [log['event'] for log in logs] == ['jikan_revalidate_failed']
+    assert logs[0]['exc_info'] is True
+    # лок снят — следующий запрос попробует снова, устаревший ответ на месте
+    assert not await redis.exists(f'{key}:lock')
+    assert json.loads(await redis.get(key)) == stale
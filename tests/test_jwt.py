@@ -0,0 +1,114 @@
+import asyncio
+import importlib
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+import jwt as pyjwt
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from fastapi import HTTPException
+
+from app.config import settings
+from app.utils import jwt as jwt_utils
+
+
+@pytest.fixture
+def decodes(monkeypatch) -> list[str]:
+    """Пустой _verified и список токенов, которые реально дошли до проверки подписи."""
+    monkeypatch.setattr(jwt_utils, '_verified', OrderedDict())
+    calls: list[str] = []
+    decode = pyjwt.decode
+
+    def counting(token, *args, **kwargs):
+        calls.append(token)
+        return decode(token, *args, **kwargs)
+
+    monkeypatch.setattr(pyjwt, 'decode', counting)
+    return calls
+
+
+@pytest.fixture(params=['RS256', 'EdDSA'])
+def asymmetric(request, monkeypatch, tmp_path):
+    """Модуль jwt, перечитанный с приватным ключом из PEM; после теста — обратно на HS256."""
+    if request.param == 'RS256':
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    else:
+        private_key = ed25519.Ed25519PrivateKey.generate()
+    pem = tmp_path / 'jwt.pem'
+    pem.write_bytes(private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption(),
+    ))
+    monkeypatch.setattr(settings, 'jwt_algorithm', request.param)
+    monkeypatch.setattr(settings, 'jwt_private_key_path', str(pem))
+    importlib.reload(jwt_utils)
+    yield request.param
+    monkeypatch.undo()
+    importlib.reload(jwt_utils)
+
+
+async def test_cache_hit_skips_signature_check(decodes):
+    token = jwt_utils.create_access_token(1, session_id='s1')
+
+    first = jwt_utils.decode_token(token)
+    assert jwt_utils.decode_token(token) is first
+    assert decodes == [token]
+
+    # logout забывает токен — следующая проверка снова идёт через подпись
+    jwt_utils.forget_token(token)
+    jwt_utils.decode_token(token)
+    assert decodes == [token, token]
+
+
+async def test_cache_is_bounded_lru(decodes, monkeypatch):
+    monkeypatch.setattr(settings, 'jwt_decode_cache_size', 2)
+    a, b, c = (jwt_utils.create_access_token(user_id) for user_id in (1, 2, 3))
+
+    jwt_utils.decode_token(a)
+    jwt_utils.decode_token(b)
+    jwt_utils.decode_token(a)  # a свежее b
+    jwt_utils.decode_token(c)
+
+    assert list(jwt_utils._verified) == [a, c]
+
+
+async def test_expired_token_is_rejected_on_cache_hit(decodes):
+    token = jwt_utils._create_token(1, 'access', timedelta(seconds=1))
+    claims = jwt_utils.decode_token(token)
+
+    await asyncio.sleep(claims['exp'] - time.time() + 0.05)
+    with pytest.raises(HTTPException) as e:
+        jwt_utils.decode_token(token)
+
+    assert e.value.detail == 'Token has expired'
+    assert token not in jwt_utils._verified
+
+
+async def test_asymmetric_tokens_verify_with_published_jwk(asymmetric):
+    token = jwt_utils.create_access_token(7, session_id='s1')
+
+    assert pyjwt.get_unverified_header(token) == {'alg': asymmetric, 'kid': settings.jwt_key_id, 'typ': 'JWT'}
+    assert jwt_utils.decode_token(token)['sub'] == '7'
+
+    # сторонний сервис: только JWK Set, без секрета и без нашего кода
+    (jwk,) = jwt_utils.jwks()['keys']
+    assert jwk['kid'] == settings.jwt_key_id and jwk['alg'] == asymmetric and jwk['use'] == 'sig'
+    assert 'd' not in jwk  # приватная часть не публикуется
+    claims = pyjwt.decode(token, pyjwt.PyJWK(jwk).key, algorithms=[asymmetric])
+    assert claims['sub'] == '7' and claims['sid'] == 's1'
+
+
+async def test_jwks_endpoint(client):
+    # в тестах HS256: секрет не публикуется
+    response = await client.get('/.well-known/jwks.json')
+    assert response.status_code == 200
+    assert response.json() == {'keys': []}
+    assert 'max-age' in response.headers['cache-control']
+
+
+async def test_jwks_endpoint_publishes_public_key(client, asymmetric):
+    response = await client.get('/.well-known/jwks.json')
+    (jwk,) = response.json()['keys']
+    token = jwt_utils.create_access_token(1)
+    assert pyjwt.decode(token, pyjwt.PyJWK(jwk).key, algorithms=[asymmetric])['sub'] == '1'
@@ -0,0 +1,38 @@
+import json
+
+from app.models.anime import Anime
+from app.models.user import User
+from app.utils.jwt import create_access_token
+
+
+async def _auth(session) -> dict[str, str]:
+    user = User(email='import@example.com', hashed_password='x')
+    session.add_all([user, Anime(title='Test', mal_id=1), Anime(title='Other', mal_id=2)])
+    await session.flush()
+    return {'Authorization': f'Bearer {create_access_token(user.id)}'}
+
+
+async def test_ndjson_import(client, session):
+    headers = await _auth(session)
+    body = '\n'.join(json.dumps({'mal_id': mal_id, 'status': 'completed'}) for mal_id in (1, 2)) + '\n{"mal_id": "x"}\n'
+
+    response = await client.post(
+        '/users/me/list/import',
+        content=body,
+        headers={**headers, 'Content-Type': 'application/x-ndjson; charset=utf-8'},
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {'imported': 2, 'queued': 0, 'skipped': 1}
+
+
+async def test_json_array_is_rejected(client, session):
+    headers = await _auth(session)
+
+    response = await client.post(
+        '/users/me/list/import',
+        json=[{'mal_id': 1, 'status': 'completed'}],
+        headers=headers,
+    )
+
+    assert response.status_code == 415
@@ -0,0 +1,68 @@
+import pytest
+from fastapi import HTTPException
+
+from app.config import settings
+from app.services.login_throttle import LoginThrottle
+
+EMAIL = 'user@example.com'
+KEY = f'throttle:login:email:{EMAIL}'
+
+
+async def _retry_after(throttle: LoginThrottle, client_ip: str | None = None) -> int:
+    """0, если попытку пропустили, иначе Retry-After из 429."""
+    try:
+        await throttle.check(EMAIL, client_ip)
+    except HTTPException as e:
+        assert e.status_code == 429
+        return int(e.headers['Retry-After'])
+    return 0
+
+
+async def _expire_lock(redis) -> None:
+    # вместо ожидания base секунд — блокировка как будто истекла
+    await redis.hset(KEY, 'locked_until', 0)
+
+
+async def test_lock_expiry_gives_a_clean_window(redis):
+    throttle = LoginThrottle(redis)
+    for _ in range(settings.login_email_limit):
+        assert await _retry_after(throttle) == 0
+        await throttle.record_failure(EMAIL)
+    assert await _retry_after(throttle) == settings.login_lockout_base
+
+    await _expire_lock(redis)
+    # проверки без новых неудач не продлевают и не наращивают блокировку
+    for _ in range(3):
+        assert await _retry_after(throttle) == 0
+    assert await redis.hget(KEY, 'level') == b'1'
+
+    # следующая серия неудач — блокировка вдвое дольше
+    for _ in range(settings.login_email_limit):
+        assert await _retry_after(throttle) == 0
+        await throttle.record_failure(EMAIL)
+    assert await _retry_after(throttle) == 2 * settings.login_lockout_base
+
+
+async def test_correct_password_after_lock_expiry_resets(redis):
+    throttle = LoginThrottle(redis)
+    for _ in range(settings.login_email_limit):
+        await throttle.record_failure(EMAIL)
+    await _expire_lock(redis)
+
+    assert await _retry_after(throttle) == 0
+    await throttle.reset(EMAIL)
+
+    for _ in range(settings.login_email_limit - 1):
+        await throttle.record_failure(EMAIL)
+    assert await _retry_after(throttle) == 0
+
+
+@pytest.mark.parametrize('attempts', [1, 2])
+async def test_ip_limit_counts_every_attempt(redis, monkeypatch, attempts):
+    monkeypatch.setattr(settings, 'login_ip_limit', attempts)
+    throttle = LoginThrottle(redis)
+
+    for _ in range(attempts):
+        assert await _retry_after(throttle, '10.0.0.1') == 0
+    assert await _retry_after(throttle, '10.0.0.1') == settings.login_lockout_base
+    assert await _retry_after(throttle, '10.0.0.2') == 0
@@ -0,0 +1,76 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+from redis.exceptions import ConnectionError as RedisConnectionError
+from sqlalchemy import select
+
+from app.config import settings
+from app.models.user import User
+from app.services import password_hasher as hasher_module
+from app.services.password_hasher import PasswordHasher
+
+
+@pytest.fixture
+async def hasher(redis):
+    hasher = PasswordHasher(workers=1, max_pending=1)
+    await hasher.start(redis)
+    yield hasher
+    await hasher.stop()
+
+
+async def test_hash_runs_in_bcrypt_pool(hasher, redis, monkeypatch):
+    monkeypatch.setattr(hasher_module, 'hash_password', lambda plain: threading.current_thread().name)
+
+    assert (await hasher.hash('password1')).startswith('bcrypt')
+    assert hasher.pending == 0
+    assert await redis.hget('metrics:password_hash', 'immediate') == b'1'
+
+
+async def test_over_max_pending_is_rejected_with_503(hasher, redis, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(hasher_module, 'hash_password', lambda plain: release.wait(5) and 'hashed')
+
+    first = asyncio.create_task(hasher.hash('password1'))
+    while hasher.pending < 1:
+        await asyncio.sleep(0)
+
+    with pytest.raises(HTTPException) as e:
+        await hasher.hash('password2')
+    assert e.value.status_code == 503
+    assert e.value.headers == {'Retry-After': '1'}
+
+    release.set()
+    assert await first == 'hashed'
+    assert await redis.hget('metrics:password_hash', 'rejected') == b'1'
+
+
+async def test_metrics_failure_does_not_hide_result_or_error(hasher, redis, monkeypatch):
+    async def broken(*args, **kwargs):
+        raise RedisConnectionError('redis down')
+
+    monkeypatch.setattr(redis, 'hincrby', broken)
+    monkeypatch.setattr(hasher_module, 'verify_password', lambda plain, hashed: plain == hashed)
+    assert await hasher.verify('same', 'same') is True
+
+    def failing(plain: str) -> str:
+        raise ValueError('bad salt')
+
+    monkeypatch.setattr(hasher_module, 'hash_password', failing)
+    with pytest.raises(ValueError, match='bad salt'):
+        await hasher.hash('password1')
+
+
+async def test_login_rehashes_after_cost_change(client, session, monkeypatch):
+    monkeypatch.setattr(settings, 'bcrypt_rounds', 4)
+    credentials = {'email': 'rehash@example.com', 'password': 'password1'}
+    assert (await client.post('/auth/register', json=credentials)).status_code == 201
+
+    monkeypatch.setattr(settings, 'bcrypt_rounds', 5)
+    assert (await client.post('/auth/login', json=credentials)).status_code == 200
+
+    hashed = await session.scalar(select(User.hashed_password).where(User.email == credentials['email']))
+    assert hashed.startswith('$2b$05$')
+    # новый хэш по-прежнему пускает
+    assert (await client.post('/auth/login', json=credentials)).status_code == 200
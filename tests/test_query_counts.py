@@ -0,0 +1,74 @@
+"""Число SQL-запросов на эндпоинт: профили загрузки не должны расползаться в N+1.
+
+Данные — 30 тайтлов по 3 жанра и список из 10 записей, так что ленивая подгрузка
+связей по строке сразу дала бы десятки запросов. Кэш принципалов перед запросом
+холодный — первая строка счёта всегда load_only пользователя.
+"""
+import pytest
+
+from app.models.anime import Anime
+from app.models.genre import Genre
+from app.models.user import User
+from app.models.user_anime_list import WatchStatus
+from app.repositories.user_anime_list_repo import UserAnimeListRepository
+from app.repositories.user_cache import user_cache
+from app.schemas.user_anime_list import UserAnimeListCreate
+from app.utils.jwt import create_access_token
+
+CASES = [
+    # (метод, url, тело, запросов)
+    ('get', '/users/me', None, 1),
+    ('get', '/users/me/list', None, 2),
+    ('get', '/users/me/list?stream=true', None, 2),
+    ('post', '/users/me/list', {'anime_id': '{free}', 'status': 'completed', 'score': 8}, 6),
+    ('patch', '/users/me/list/{listed}', {'progress': 3}, 3),
+    ('delete', '/users/me/list/{listed}', None, 3),
+    ('get', '/users/me/recommendations', None, 4),
+    ('get', '/anime/{listed}', None, 3),
+    ('get', '/anime/', None, 1),
+    ('get', '/anime/?genre=Genre 1&year=2020', None, 1),
+]
+
+
+@pytest.fixture
+async def seeded(session) -> tuple[dict[str, str], dict[str, int]]:
+    """Заголовок авторизации и id тайтлов: listed — в списке пользователя, free — нет."""
+    genres = [Genre(name=f'Genre {i}', mal_id=i) for i in range(3)]
+    animes = [
+        Anime(title=f'Title {i}', mal_id=i, score=5 + i / 10, year=2020, genres=genres)
+        for i in range(30)
+    ]
+    user = User(email='counts@example.com', hashed_password='x')
+    session.add_all([*animes, user])
+    await session.flush()
+    user_id, anime_ids = user.id, [anime.id for anime in animes]
+
+    await UserAnimeListRepository(session).bulk_upsert(user_id, [
+        UserAnimeListCreate(anime_id=anime_id, status=WatchStatus.WATCHING) for anime_id in anime_ids[:10]
+    ])
+    headers = {'Authorization': f'Bearer {create_access_token(user_id)}'}
+    return headers, {'listed': anime_ids[0], 'free': anime_ids[-1]}
+
+
+@pytest.mark.parametrize(('method', 'url', 'body', 'expected'), CASES, ids=[f'{m} {u}' for m, u, _, _ in CASES])
+async def test_query_count(client, queries, seeded, method, url, body, expected):
+    headers, ids = seeded
+    if body is not None:
+        body = {k: int(v.format(**ids)) if isinstance(v, str) and '{' in v else v for k, v in body.items()}
+    await user_cache.stop()
+    queries.clear()
+
+    response = await client.request(method.upper(), url.format(**ids), headers=headers, json=body)
+
+    assert response.is_success, response.text
+    assert len(queries) == expected, '\n'.join(queries)
+
+
+async def test_cached_catalog_page_makes_no_queries(client, queries, seeded):
+    await client.get('/anime/')
+    queries.clear()
+
+    response = await client.get('/anime/')
+
+    assert response.status_code == 200
+    assert queries == []
@@ -0,0 +1,73 @@
+import json
+
+import numpy as np
+import pytest
+
+from app.models.anime import Anime
+from app.services import recommendation_service
+from app.services.item_similarity import ItemSimilarityIndex, build_index, save_index
+
+ENTRY = {'status': 'completed', 'score': 9}
+
+
+@pytest.fixture
+async def titles(session, tmp_path, monkeypatch) -> list[int]:
+    """Четыре тайтла и индекс соседей: A~B 0.82, A~C 0.71, B~C 0.58, B~D 0.41."""
+    animes = [Anime(title=name, mal_id=mal_id) for mal_id, name in enumerate('ABCD', start=1)]
+    session.add_all(animes)
+    await session.flush()
+    a, b, c, d = (anime.id for anime in animes)
+
+    columns = {a: [1, 1, 0, 0], b: [1, 1, 1, 0], c: [1, 0, 0, 0], d: [0, 0, 1, 1]}
+    users, items, weights = zip(*(
+        (user, item, weight)
+        for item, column in columns.items()
+        for user, weight in enumerate(column)
+        if weight
+    ))
+    path = tmp_path / 'items.npy'
+    save_index(build_index(np.array(users), np.array(items), np.array(weights, dtype=float), top_k=3), path)
+    monkeypatch.setattr(recommendation_service, 'item_index', ItemSimilarityIndex(path))
+    return [a, b, c, d]
+
+
+async def _login(client) -> dict[str, str]:
+    response = await client.post('/auth/register', json={'email': 'recs@example.com', 'password': 'password1'})
+    return {'Authorization': f"Bearer {response.json()['access_token']}"}
+
+
+async def _recommended(client, headers) -> list[int]:
+    response = await client.get('/users/me/recommendations', params={'limit': 2}, headers=headers)
+    assert response.status_code == 200
+    return [anime['id'] for anime in response.json()]
+
+
+async def test_recommendations_cached_until_list_changes(client, redis, titles, monkeypatch):
+    a, b, c, d = titles
+    headers = await _login(client)
+    user_id = (await client.get('/users/me', headers=headers)).json()['id']
+    assert (await client.post('/users/me/list', json={'anime_id': a, **ENTRY}, headers=headers)).status_code == 201
+
+    assert await _recommended(client, headers) == [b, c]
+    assert json.loads(await redis.hget(f'recs:{user_id}', '2')) == [b, c]
+
+    # повторный запрос — из recs:{user_id}, индекс не трогается
+    def unreachable(seen, limit):
+        raise AssertionError('ожидался ответ из кэша')
+
+    with monkeypatch.context() as patched:
+        patched.setattr(recommendation_service.item_index, 'recommend', unreachable)
+        assert await _recommended(client, headers) == [b, c]
+
+    # изменение списка в users.py сбрасывает кэш, следующий ответ учитывает B
+    assert (await client.post('/users/me/list', json={'anime_id': b, **ENTRY}, headers=headers)).status_code == 201
+    assert not await redis.exists(f'recs:{user_id}')
+    assert await _recommended(client, headers) == [c, d]
+
+    assert (await client.patch(f'/users/me/list/{b}', json={'score': 3}, headers=headers)).status_code == 200
+    assert not await redis.exists(f'recs:{user_id}')
+    await _recommended(client, headers)
+
+    assert (await client.delete(f'/users/me/list/{b}', headers=headers)).status_code == 204
+    assert not await redis.exists(f'recs:{user_id}')
+    assert await _recommended(client, headers) == [b, c]
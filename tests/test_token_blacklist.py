@@ -0,0 +1,74 @@
+import asyncio
+import time
+
+from app.repositories.token_blacklist import KEY_PREFIX, TokenBlacklist
+
+
+def _expires_in(seconds: int) -> int:
+    return int(time.time()) + seconds
+
+
+async def _wait_for(condition, timeout: float = 2.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'не дождались'
+        await asyncio.sleep(0.01)
+
+
+async def test_revoke_before_start_writes_to_redis(redis):
+    blacklist = TokenBlacklist()
+
+    await blacklist.revoke('jti-1', _expires_in(60), redis)
+
+    assert 0 < await redis.ttl(f'{KEY_PREFIX}jti-1') <= 60
+    assert await TokenBlacklist().is_revoked('jti-1', redis)
+
+
+async def test_unsynced_blacklist_asks_redis(redis):
+    blacklist = TokenBlacklist()
+    await redis.set(f'{KEY_PREFIX}jti-1', '1', ex=60)
+
+    assert await blacklist.is_revoked('jti-1', redis)
+    assert not await blacklist.is_revoked('jti-2', redis)
+
+
+async def test_revocation_reaches_other_workers_via_pubsub(redis):
+    worker = TokenBlacklist()
+    await worker.start(redis)
+    try:
+        await _wait_for(lambda: worker._synced)
+
+        await TokenBlacklist().revoke('jti-1', _expires_in(60), redis)
+        await _wait_for(lambda: 'jti-1' in worker._revoked)
+
+        # синхронизированный воркер отвечает из памяти, в Redis не ходит
+        await redis.delete(f'{KEY_PREFIX}jti-1')
+        assert await worker.is_revoked('jti-1', redis)
+    finally:
+        await worker.stop()
+
+
+async def test_expired_revocations_are_pruned(redis):
+    worker = TokenBlacklist()
+    await worker.start(redis)
+    try:
+        await _wait_for(lambda: worker._synced)
+        await worker._on_message(f'old:{time.time() - 1}'.encode())
+        await worker._on_message(f'live:{time.time() + 60}'.encode())
+
+        assert not await worker.is_revoked('old', redis)
+        assert await worker.is_revoked('live', redis)
+        assert set(worker._revoked) == {'live'}
+    finally:
+        await worker.stop()
+
+
+async def test_logout_without_lifespan_revokes_access_token(client):
+    tokens = (await client.post('/auth/register', json={'email': 'logout@example.com', 'password': 'password1'})).json()
+    headers = {'Authorization': f"Bearer {tokens['access_token']}"}
+
+    assert (await client.post('/auth/logout', headers=headers)).status_code == 200
+
+    response = await client.get('/users/me', headers=headers)
+    assert response.status_code == 401
+    assert response.json()['detail'] == 'Token has been revoked'